@@ -9,9 +9,11 @@ from oafuncs.oa_tool import PEx
 def _interp_single_worker(*args):
     """
     用于PEx并行的单slice插值worker。
-    参数: data_slice, origin_points, target_points, interpolation_method, target_shape
+    参数: source_data, t_index, z_index, origin_points, target_points, interpolation_method, target_shape
+    source_data、origin_points 和 target_points 通过共享内存传入（只读），每个任务只取自己的 slice
     """
-    data_slice, origin_points, target_points, interpolation_method, target_shape = args
+    source_data, t_index, z_index, origin_points, target_points, interpolation_method, target_shape = args
+    data_slice = source_data[t_index, z_index]
     # 过滤掉包含 NaN 的点
     valid_mask = ~np.isnan(data_slice.ravel())
     valid_data = data_slice.ravel()[valid_mask]
@@ -84,13 +86,14 @@ def interp_2d_func(target_x_coordinates: Union[np.ndarray, List[float]], target_
 
     t, z, y, x = new_src_data.shape
 
-    params = []
     target_shape = target_y_coordinates.shape
-    for t_index in range(t):
-        for z_index in range(z):
-            params.append((new_src_data[t_index, z_index], origin_points, target_points, interpolation_method, target_shape))
+    result = np.empty((t * z, *target_shape), dtype=np.float64)
 
     with PEx() as excutor:
-        result = excutor.run(_interp_single_worker, params)
+        # 源数据和网格坐标只放入共享内存一次，任务参数中只传句柄；参数按需生成、结果逐个写入输出数组
+        shared_data, shared_origin, shared_target = excutor.share(new_src_data), excutor.share(origin_points), excutor.share(target_points)
+        params = ((shared_data, t_index, z_index, shared_origin, shared_target, interpolation_method, target_shape) for t_index in range(t) for z_index in range(z))
+        for i, slice_result in enumerate(excutor.imap(_interp_single_worker, params)):
+            result[i] = np.nan if slice_result is None else slice_result
 
-    return np.squeeze(np.array(result).reshape(t, z, *target_shape))
+    return np.squeeze(result.reshape(t, z, *target_shape))
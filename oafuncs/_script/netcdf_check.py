@@ -0,0 +1,164 @@
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Union
+
+from rich import print
+
+from oafuncs._script.netcdf_files import collect_nc_files
+
+__all__ = ["check_many_nc"]
+
+# 默认的检查结果索引，键为绝对路径，记录文件大小、修改时间和检查结果
+_DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "oafuncs", "nc_check.json")
+
+
+def _edge_indices(var):
+    """变量第一个和最后一个分块（连续存储时为第一个和最后一个元素）的索引"""
+    shape = var.shape
+    chunking = var.chunking()
+    if isinstance(chunking, list):
+        first = tuple(slice(0, min(c, s)) for c, s in zip(chunking, shape))
+        last = tuple(slice((s - 1) // c * c, s) for c, s in zip(chunking, shape))
+    else:
+        first = tuple(0 for _ in shape)
+        last = tuple(s - 1 for s in shape)
+    return first, last
+
+
+def _check_file(file: str, deep: bool) -> Optional[str]:
+    """
+    检查单个文件，返回 None 表示通过，否则返回错误信息。
+    默认只读取文件头；deep 为 True 时读取每个变量的第一个和最后一个分块，截断的下载通常在最后一个分块处读取失败。
+    NetCDF3 文件读取文件末尾之外的数据不会报错，因此另外检查文件大小是否至少为所有变量数据的总字节数
+    """
+    import netCDF4 as nc
+
+    try:
+        with nc.Dataset(file, "r") as ds:
+            if not ds.variables:
+                return "Empty variables in file"
+            _ = ds.__dict__
+            if deep and ds.data_model.startswith("NETCDF3"):
+                data_bytes = sum(-(-var.size * var.dtype.itemsize // 4) * 4 for var in ds.variables.values())
+                if os.path.getsize(file) < data_bytes:
+                    return f"File is truncated: {os.path.getsize(file)} bytes, variables need at least {data_bytes} bytes"
+            for var in ds.variables.values():
+                _ = var.shape
+                if not deep:
+                    break
+                var.set_auto_maskandscale(False)
+                if var.ndim == 0:
+                    _ = var[...]
+                elif var.size > 0:
+                    for index in _edge_indices(var):
+                        _ = var[index]
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def _stat(file: str):
+    """文件大小和修改时间（纳秒），文件不存在时返回 None"""
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load_cache(cache_file: str) -> dict:
+    """读取检查结果索引，不存在或损坏时返回空字典"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_file: str, cache: dict) -> None:
+    """与磁盘上的索引合并后原子写回，多个进程同时检查时不会互相覆盖或写坏"""
+    cache = {**_load_cache(cache_file), **cache}
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, cache_file)
+
+
+def check_many_nc(
+    pattern: Union[str, List[str]],
+    deep: bool = False,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    cache_file: Optional[str] = None,
+    delete_if_invalid: bool = False,
+    print_messages: bool = True,
+) -> dict:
+    """
+    批量检查 NetCDF 文件。先用线程池并行获取所有文件的大小和修改时间，与索引中的记录一致的文件直接使用缓存结果，不再打开；
+    其余文件在进程池中检查（netCDF-C/HDF5 不是线程安全的），结果写回索引。深度检查的结果也可用于普通检查，反之不行
+
+    参数:
+        pattern: 通配符（支持 ** 递归）、目录或文件列表
+        deep: 是否读取每个变量的第一个和最后一个分块
+        workers: 检查文件的进程数，None 表示逐个检查
+        use_cache: 是否使用检查结果索引
+        cache_file: 索引文件路径，None 表示 ~/.cache/oafuncs/nc_check.json
+        delete_if_invalid: 是否删除检查失败的文件
+        print_messages: 是否打印检查失败的文件和汇总信息
+
+    返回:
+        dict: 通过/失败/命中缓存的文件数，以及逐文件结果 "files"（file, valid, error）
+    """
+    files = collect_nc_files(pattern)
+    cache_file = cache_file or _DEFAULT_CACHE_FILE
+    cache = _load_cache(cache_file) if use_cache else {}
+
+    with ThreadPoolExecutor(max_workers=min(32, max(1, len(files)))) as executor:
+        stats = list(executor.map(_stat, files))
+
+    results = {}
+    todo = []
+    for file, stat in zip(files, stats):
+        entry = cache.get(file)
+        if stat is None:
+            results[file] = {"file": file, "valid": False, "error": "File not found", "cached": False}
+        elif entry is not None and [entry["size"], entry["mtime_ns"]] == list(stat) and (entry["deep"] or not deep):
+            results[file] = {"file": file, "valid": entry["error"] is None, "error": entry["error"], "cached": True}
+        else:
+            todo.append((file, stat))
+
+    n_workers = max(1, min(workers or 1, len(todo)))
+    if n_workers == 1:
+        errors = [_check_file(file, deep) for file, _ in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn")) as executor:
+            errors = list(executor.map(_check_file, [file for file, _ in todo], [deep] * len(todo), chunksize=max(1, len(todo) // (n_workers * 8))))
+
+    new_entries = {}
+    for (file, (size, mtime_ns)), error in zip(todo, errors):
+        results[file] = {"file": file, "valid": error is None, "error": error, "cached": False}
+        new_entries[file] = {"size": size, "mtime_ns": mtime_ns, "deep": deep, "error": error}
+    if use_cache and new_entries:
+        _save_cache(cache_file, new_entries)
+
+    results = [results[file] for file in files]
+    invalid = [r for r in results if not r["valid"]]
+    for r in invalid:
+        if print_messages:
+            print(f"[red]File validation failed: {r['file']} - {r['error']}[/red]")
+        if delete_if_invalid and os.path.exists(r["file"]):
+            try:
+                os.remove(r["file"])
+                if print_messages:
+                    print(f"[red]Deleted corrupted file: {r['file']}[/red]")
+            except Exception as del_error:
+                if print_messages:
+                    print(f"[red]Failed to delete file: {r['file']} - {str(del_error)}[/red]")
+
+    summary = {"valid": len(results) - len(invalid), "invalid": len(invalid), "cached": sum(r["cached"] for r in results), "files": results}
+    if print_messages:
+        print(f"[green]Checked {len(results)} file(s): {summary['valid']} valid, {summary['invalid']} invalid, {summary['cached']} from cache[/green]")
+    return summary
@@ -0,0 +1,151 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Union
+
+import psutil
+from rich import print
+
+from oafuncs._script.netcdf_files import collect_nc_files, natural_sort_key
+
+__all__ = ["compress_many_nc"]
+
+
+# netCDF4 Variable.filters() 中表示压缩过滤器的键（shuffle、fletcher32 本身不压缩）
+_COMPRESSION_FILTERS = ("zlib", "szip", "zstd", "bzip2", "blosc")
+
+
+def _is_packed(file: str) -> bool:
+    """
+    只读文件头判断是否已经压缩：任一变量带有 scale_factor 属性（已打包），或启用了 zlib/szip/zstd/bzip2/blosc 等
+    压缩过滤器（如位舍入或只做了无损压缩的文件）即视为已压缩，不读取也不解码数据
+    """
+    import netCDF4 as nc
+
+    with nc.Dataset(file, "r") as ds:
+        ds.set_auto_maskandscale(False)
+        for var in ds.variables.values():
+            if "scale_factor" in var.ncattrs():
+                return True
+            filters = var.filters() or {}
+            if any(filters.get(key) for key in _COMPRESSION_FILTERS):
+                return True
+        return False
+
+
+def _auto_workers(n_files: int, workers: Optional[int], chunk_budget_mb: float) -> int:
+    """
+    按可用内存限制进程数：每个进程约需 3 个切片大小的内存（读入切片、打包缓冲区和 xarray 临时数组）
+    """
+    per_worker = max(chunk_budget_mb * 3, 64) * 1024**2
+    mem_limit = max(1, int(psutil.virtual_memory().available // per_worker))
+    cpu_limit = psutil.cpu_count(logical=True) or 1
+    limit = min(workers or cpu_limit, mem_limit)
+    return max(1, min(limit, n_files))
+
+
+def _compress_worker(file: str, convert_dtype: str, chunk_budget_mb: float, significant_bits: Optional[int], significant_digits: Optional[int], skip_packed: bool) -> dict:
+    """
+    子进程中压缩单个文件：先写到同目录的临时文件，成功后用 os.replace 原子替换原文件；
+    若结果并不更小，则丢弃临时文件保留原文件
+    """
+    import xarray as xr
+
+    from oafuncs._script.netcdf_write import save_to_nc
+
+    result = {"file": file, "status": "compressed", "before": os.path.getsize(file), "after": None, "error": None}
+    try:
+        if skip_packed and _is_packed(file):
+            result["status"] = "skipped"
+            result["after"] = result["before"]
+            return result
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"无法读取文件头: {e}"
+        return result
+
+    tmp_file = os.path.join(os.path.dirname(file), f".{os.path.basename(file)}.{os.getpid()}.tmp")
+    try:
+        with xr.open_dataset(file) as ds:
+            save_to_nc(tmp_file, ds, convert_dtype=convert_dtype, streaming=True, chunk_budget_mb=chunk_budget_mb, significant_bits=significant_bits, significant_digits=significant_digits)
+        after = os.path.getsize(tmp_file)
+        if after >= result["before"]:
+            os.remove(tmp_file)
+            result["status"] = "kept"
+            result["after"] = result["before"]
+        else:
+            os.replace(tmp_file, file)
+            result["after"] = after
+    except Exception as e:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        result["status"] = "failed"
+        result["error"] = str(e)
+    return result
+
+
+def _print_summary(results: List[dict]) -> dict:
+    """汇总并打印压缩前后大小"""
+    summary = {"compressed": 0, "skipped": 0, "kept": 0, "failed": 0, "before": 0, "after": 0}
+    for r in results:
+        summary[r["status"]] += 1
+        if r["status"] != "failed":
+            summary["before"] += r["before"]
+            summary["after"] += r["after"]
+    saved = summary["before"] - summary["after"]
+    ratio = saved / summary["before"] * 100 if summary["before"] else 0.0
+    print(f"[green]压缩完成: {summary['compressed']} 个文件已压缩, {summary['skipped']} 个已打包跳过, {summary['kept']} 个无收益保留原文件, {summary['failed']} 个失败[/green]")
+    print(f"[green]总大小: {summary['before'] / 1024**2:.2f} MB -> {summary['after'] / 1024**2:.2f} MB, 节省 {saved / 1024**2:.2f} MB ({ratio:.1f}%)[/green]")
+    for r in results:
+        if r["status"] == "failed":
+            print(f"[red]{r['file']} 压缩失败: {r['error']}[/red]")
+    return summary
+
+
+def compress_many_nc(
+    pattern: Union[str, List[str]],
+    workers: Optional[int] = None,
+    convert_dtype: str = "int16",
+    chunk_budget_mb: float = 256,
+    significant_bits: Optional[int] = None,
+    significant_digits: Optional[int] = None,
+    skip_packed: bool = True,
+) -> dict:
+    """
+    批量压缩 NetCDF 文件，每个文件在独立进程中流式压缩并原子替换原文件
+
+    参数:
+        pattern: 通配符（支持 ** 递归）、目录或文件列表
+        workers: 最大进程数，None 表示 CPU 核数；实际进程数还受可用内存限制
+        convert_dtype: 打包的整数类型
+        chunk_budget_mb: 每个进程单个切片的内存预算 (MB)
+        significant_bits / significant_digits: 位舍入模式，同 save_to_nc
+        skip_packed: 是否跳过已压缩的文件（带 scale_factor 或已启用压缩过滤器）
+
+    返回:
+        dict: 汇总信息，包含各状态文件数、压缩前后总字节数以及逐文件结果 "files"
+    """
+    files = collect_nc_files(pattern)
+    if not files:
+        print(f"[yellow]没有找到匹配的文件: {pattern}[/yellow]")
+        return {"compressed": 0, "skipped": 0, "kept": 0, "failed": 0, "before": 0, "after": 0, "files": []}
+
+    n_workers = _auto_workers(len(files), workers, chunk_budget_mb)
+    print(f"[yellow]共 {len(files)} 个文件，使用 {n_workers} 个进程压缩[/yellow]")
+
+    args = (convert_dtype, chunk_budget_mb, significant_bits, significant_digits, skip_packed)
+    results = []
+    if n_workers == 1:
+        for file in files:
+            results.append(_compress_worker(file, *args))
+    else:
+        # netCDF-C/HDF5 不是线程安全的，因此每个文件交给独立进程处理
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn")) as executor:
+            futures = [executor.submit(_compress_worker, file, *args) for file in files]
+            for future in as_completed(futures):
+                results.append(future.result())
+        results.sort(key=lambda r: natural_sort_key(r["file"]))
+
+    summary = _print_summary(results)
+    summary["files"] = results
+    return summary
@@ -0,0 +1,25 @@
+import glob
+import os
+import re
+from typing import List, Union
+
+__all__ = ["natural_sort_key", "collect_nc_files"]
+
+
+def natural_sort_key(s: str):
+    """自然排序键，保证 file_2 排在 file_10 之前"""
+    return [int(text) if text.isdigit() else text.lower() for text in re.split("([0-9]+)", s)]
+
+
+def collect_nc_files(pattern: Union[str, List[str]]) -> List[str]:
+    """
+    展开通配符（支持 ** 递归）、目录（其下所有 .nc 文件）或文件列表，返回去重后自然排序的绝对路径
+    """
+    patterns = [pattern] if isinstance(pattern, str) else list(pattern)
+    files = set()
+    for p in patterns:
+        p = str(p)
+        if os.path.isdir(p):
+            p = os.path.join(p, "**", "*.nc")
+        files.update(os.path.abspath(f) for f in glob.glob(p, recursive=True) if os.path.isfile(f))
+    return sorted(files, key=natural_sort_key)
@@ -0,0 +1,79 @@
+import os
+from typing import List, Optional, Union
+
+import netCDF4 as nc
+import numpy as np
+import xarray as xr
+
+from oafuncs._script.netcdf_merge import _define_output, _iter_selection, _read_header, _select_vars
+
+__all__ = ["isel_nc"]
+
+
+def _index_runs(indices: np.ndarray) -> list:
+    """把索引序列中连续递增的部分合并为一段，返回 runs [(文件内起始位置, 输出起始位置, 长度)]，每段只需一次超平面读取"""
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate([[0], breaks])
+    stops = np.concatenate([breaks, [indices.size]])
+    return [(int(indices[a]), int(a), int(b - a)) for a, b in zip(starts, stops)]
+
+
+def _normalize_indices(indices, size: int) -> np.ndarray:
+    """整数、整数列表或切片转换为非负的整数索引数组（保持给定顺序，允许重复）"""
+    if isinstance(indices, slice):
+        return np.arange(size)[indices]
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    indices = np.where(indices < 0, indices + size, indices)
+    if np.any((indices < 0) | (indices >= size)):
+        raise IndexError(f"Indices out of range for dimension of length {size}.")
+    return indices
+
+
+def isel_nc(file_path: str, dim_name: str, indices: Union[int, List[int], slice], output_file: Optional[str] = None, chunk_budget_mb: float = 256) -> Optional[xr.Dataset]:
+    """
+    沿一个维度按索引取子集：只用 netCDF4 超平面读取被选中的记录，连续的索引合并为一次读取，不解码、不加载整个文件。
+
+    output_file 为 None 时读取原始值组装 Dataset，再用 xr.decode_cf 按与 xr.open_dataset 相同的规则解码后返回（全部在内存中）；
+    否则按源文件的类型、打包参数、压缩和分块设置定义输出文件，逐切片直接复制原始值，返回 None
+    """
+    with nc.Dataset(file_path) as src:
+        if dim_name not in src.dimensions:
+            raise ValueError(f"Dimension '{dim_name}' not found in {file_path}")
+        indices = _normalize_indices(indices, len(src.dimensions[dim_name]))
+    runs = _index_runs(indices) if indices.size else []
+
+    header = _read_header(file_path, dim_name)
+    var_names = _select_vars(header, None)
+
+    if output_file is not None:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        with nc.Dataset(file_path) as src, nc.Dataset(output_file, "w", format="NETCDF4") as dst:
+            src.set_auto_maskandscale(False)
+            _define_output(dst, header, var_names, dim_name, int(indices.size))
+            for var in var_names:
+                src_var, dst_var = src.variables[var], dst.variables[var]
+                for run in runs if dim_name in src_var.dimensions else [None]:
+                    for src_index, dst_index in _iter_selection(src_var, dim_name, {}, chunk_budget_mb, run):
+                        dst_var[dst_index] = src_var[src_index]
+        return None
+
+    data_vars = {}
+    with nc.Dataset(file_path) as src:
+        src.set_auto_maskandscale(False)
+        for var in var_names:
+            src_var = src.variables[var]
+            if dim_name not in src_var.dimensions:
+                data = src_var[...]
+            else:
+                shape = tuple(int(indices.size) if d == dim_name else s for d, s in zip(src_var.dimensions, src_var.shape))
+                data = np.empty(shape, dtype=src_var.dtype if isinstance(src_var.dtype, np.dtype) else object)
+                for run in runs:
+                    for src_index, dst_index in _iter_selection(src_var, dim_name, {}, chunk_budget_mb, run):
+                        data[dst_index] = src_var[src_index]
+            data = np.asarray(data)
+            if src_var.dtype is str:
+                # 与 xr.open_dataset 一致，变长字符串转为定长 Unicode 数组
+                data = data.astype(str)
+            data_vars[var] = xr.Variable(src_var.dimensions, data, attrs=header["vars"][var]["attrs"])
+    return xr.decode_cf(xr.Dataset(data_vars, attrs=header["attrs"]))
@@ -1,13 +1,854 @@
 import logging
+import multiprocessing as mp
 import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional, Union
 
+import netCDF4 as nc
+import numpy as np
 import xarray as xr
 
 from oafuncs import pbar
+from oafuncs._script.netcdf_write import _data_to_scale_offset, _encode_append_coord, _finite_min_max, _get_dtype_info, _iter_slabs, _load_slab, _scale_offset_from_min_max, _streaming_min_max
 
 
-def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, List[str]]] = None, dim_name: Optional[str] = None, target_filename: Optional[str] = None) -> None:
+# 文件头缓存（LRU）：键为 (绝对路径, 文件大小, 修改时间, 合并维度)，文件改动后自动失效；
+# 最多保留 _MAX_HEADERS 个，长期运行的进程反复合并不同文件时内存不会无限增长
+_HEADER_CACHE: "OrderedDict[tuple, dict]" = OrderedDict()
+_MAX_HEADERS = 4096
+
+
+def _read_header(file: str, dim_name: Optional[str]) -> dict:
+    """
+    只读取单个文件的文件头：全局属性、维度、各变量的维度/形状/类型/属性/压缩与分块设置，
+    以及合并维度上坐标变量的原始值（通常很小）。返回可跨进程传递的字典
+    """
+    with nc.Dataset(file) as ds:
+        ds.set_auto_maskandscale(False)
+        header = {
+            "file": file,
+            "attrs": {k: ds.getncattr(k) for k in ds.ncattrs()},
+            "dims": {name: (len(dim), dim.isunlimited()) for name, dim in ds.dimensions.items()},
+            "vars": {},
+            "dim_values": None,
+        }
+        for name, var in ds.variables.items():
+            header["vars"][name] = {
+                "dims": var.dimensions,
+                "shape": var.shape,
+                "dtype": var.dtype,
+                "attrs": {k: var.getncattr(k) for k in var.ncattrs()},
+                "filters": var.filters(),
+                "chunking": var.chunking(),
+            }
+        if dim_name in ds.variables and ds.variables[dim_name].dimensions == (dim_name,):
+            header["dim_values"] = ds.variables[dim_name][:]
+    return header
+
+
+def _scan_headers(file_list: List[str], dim_name: Optional[str], executor=None) -> List[dict]:
+    """
+    读取所有输入文件的文件头（有进程池时并行读取），结果按 (路径, 大小, 修改时间) 缓存，重复合并时不再打开文件。
+    本次需要的文件头先保存在局部字典中，文件数超过缓存上限时也不会在返回前被淘汰
+    """
+    keys = []
+    for file in file_list:
+        stat = os.stat(file)
+        keys.append((os.path.abspath(file), stat.st_size, stat.st_mtime_ns, dim_name))
+    found = {}
+    for key in keys:
+        if key in _HEADER_CACHE:
+            _HEADER_CACHE.move_to_end(key)
+            found[key] = _HEADER_CACHE[key]
+    todo = [(file, key) for file, key in zip(file_list, keys) if key not in found]
+    if todo:
+        files = [file for file, _ in todo]
+        if executor is not None and len(files) > 1:
+            headers = executor.map(_read_header, files, [dim_name] * len(files), chunksize=max(1, len(files) // 64))
+        else:
+            headers = (_read_header(file, dim_name) for file in files)
+        for (_, key), header in zip(todo, headers):
+            found[key] = header
+            _HEADER_CACHE[key] = header
+            while len(_HEADER_CACHE) > _MAX_HEADERS:
+                _HEADER_CACHE.popitem(last=False)
+    return [found[key] for key in keys]
+
+
+def _is_packed(var_header: dict) -> bool:
+    """变量是否使用了 scale_factor/add_offset 打包（且存储类型为整数）"""
+    attrs = var_header["attrs"]
+    return ("scale_factor" in attrs or "add_offset" in attrs) and isinstance(var_header["dtype"], np.dtype) and var_header["dtype"].kind == "i"
+
+
+def _packing_key(var_header: dict):
+    """决定打包整数能否直接复制的编码信息：存储类型、scale_factor、add_offset 和填充值"""
+    attrs = var_header["attrs"]
+    return tuple(np.asarray(attrs.get(k, np.nan)).tobytes() for k in ("scale_factor", "add_offset", "_FillValue", "missing_value")) + (str(var_header["dtype"]),)
+
+
+def _select_vars(header, var_names):
+    """
+    确定要写出的变量：var_names 为 None 时取全部变量，否则取指定变量及其维度对应的坐标变量（保持文件中的顺序）
+    """
+    variables = header["vars"]
+    if var_names is None:
+        return list(variables)
+    missing = [v for v in var_names if v not in variables]
+    if missing:
+        raise ValueError(f"Variables {missing} not found in {header['file']}")
+    dims = {d for v in var_names for d in variables[v]["dims"]}
+    return [v for v in variables if v in var_names or (v in dims and variables[v]["dims"] == (v,))]
+
+
+def _check_headers(headers, var_names, dim_name):
+    """
+    根据文件头检查合并维度和变量是否存在、其余维度长度是否与第一个文件一致，返回各文件沿合并维度的长度
+    """
+    header0 = headers[0]
+    ref_sizes = {d: size for d, (size, _) in header0["dims"].items() if d != dim_name}
+    merge_vars = [v for v in var_names if dim_name in header0["vars"][v]["dims"]]
+
+    lengths = []
+    for header in headers:
+        file = header["file"]
+        if dim_name not in header["dims"]:
+            raise ValueError(f"Dimension '{dim_name}' not found in {file}")
+        for var in merge_vars:
+            if var not in header["vars"]:
+                raise ValueError(f"Variable '{var}' not found in {file}")
+            for d in header["vars"][var]["dims"]:
+                size = header["dims"][d][0]
+                if d != dim_name and size != ref_sizes.get(d):
+                    raise ValueError(f"Dimension '{d}' of '{var}' in {file} has length {size}, expected {ref_sizes.get(d)}")
+        lengths.append(header["dims"][dim_name][0])
+    return lengths
+
+
+def _define_output(dst, header0, var_names, dim_name, total_length, selection=None, pack_params=None):
+    """
+    按第一个文件的文件头定义输出文件：全局属性、维度（合并维度长度为总长度，被选择的维度为选择后的长度，
+    无限长维度保持无限长）、变量的类型、填充值、压缩和分块设置（分块不超过维度长度）以及属性。
+    pack_params 中需要重新打包的变量，缺测由 _data_to_scale_offset 写为整数类型的最小值，
+    因此其 _FillValue（以及已有的 missing_value）改为该值，而不是沿用第一个文件的填充值
+    """
+    selection = selection or {}
+    pack_params = pack_params or {}
+    dst.setncatts(header0["attrs"])
+    used_dims = {d for v in var_names for d in header0["vars"][v]["dims"]}
+    out_sizes = {}
+    for name, (size, unlimited) in header0["dims"].items():
+        if name not in used_dims:
+            continue
+        out_sizes[name] = total_length if name == dim_name else len(selection[name]) if name in selection else size
+        dst.createDimension(name, None if unlimited else out_sizes[name])
+
+    for var in var_names:
+        var_header = header0["vars"][var]
+        attrs = var_header["attrs"]
+        kwargs = {}
+        if var in pack_params:
+            repack_fill = _get_dtype_info(pack_params[var][2])[1]
+            attrs = {**attrs, "_FillValue": repack_fill}
+            if "missing_value" in attrs:
+                attrs["missing_value"] = np.asarray(repack_fill, dtype=var_header["dtype"])
+        if "_FillValue" in attrs:
+            kwargs["fill_value"] = attrs["_FillValue"]
+        filters = var_header["filters"] or {}
+        if filters.get("zlib"):
+            kwargs.update(zlib=True, complevel=filters.get("complevel", 4))
+        if filters.get("shuffle"):
+            kwargs["shuffle"] = True
+        if isinstance(var_header["chunking"], list):
+            kwargs["chunksizes"] = [min(c, out_sizes[d]) if out_sizes[d] > 0 else c for c, d in zip(var_header["chunking"], var_header["dims"])]
+        dst_var = dst.createVariable(var, var_header["dtype"], var_header["dims"], **kwargs)
+        dst_var.setncatts({k: v for k, v in attrs.items() if k != "_FillValue"})
+        dst_var.set_auto_maskandscale(False)
+
+
+def _as_selector(indices, size):
+    """整数索引转换为维度上的选择：等步长递增时用 range（读取时为带步长的超平面切片），否则用整数数组"""
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    indices = np.where(indices < 0, indices + size, indices)
+    if indices.size == 0:
+        raise ValueError("Selection is empty.")
+    if np.any((indices < 0) | (indices >= size)):
+        raise IndexError(f"Selection {indices.tolist()} out of range for dimension of length {size}.")
+    steps = np.diff(indices)
+    if indices.size == 1 or (steps[0] > 0 and np.all(steps == steps[0])):
+        step = int(steps[0]) if indices.size > 1 else 1
+        return range(int(indices[0]), int(indices[-1]) + 1, step)
+    return indices
+
+
+def _normalize_selection(file, dim_name, isel=None, sel=None):
+    """
+    将 isel（整数、切片或整数列表）和 sel（坐标值、值区间切片或值列表，值需与坐标完全一致）
+    转换为各维度上的选择（range 或整数数组）。sel 使用第一个文件中的坐标变量；合并维度不能被选择
+    """
+    selection = {}
+    with nc.Dataset(file) as ds:
+        ds.set_auto_maskandscale(False)
+        for dim, key in {**(isel or {}), **(sel or {})}.items():
+            if dim == dim_name:
+                raise ValueError(f"Selection on the merge dimension '{dim_name}' is not supported, use sort/duplicates instead.")
+            if dim not in ds.dimensions:
+                raise ValueError(f"Dimension '{dim}' not found in {file}")
+            size = len(ds.dimensions[dim])
+            if dim in (isel or {}):
+                indices = np.arange(size)[key] if isinstance(key, slice) else key
+            else:
+                if dim not in ds.variables:
+                    raise ValueError(f"Coordinate variable '{dim}' not found in {file}, use isel instead of sel.")
+                values = np.asarray(ds.variables[dim][:])
+                if isinstance(key, slice):
+                    lo, hi = key.start, key.stop
+                    if lo is not None and hi is not None and lo > hi:
+                        lo, hi = hi, lo
+                    mask = np.ones(size, dtype=bool)
+                    if lo is not None:
+                        mask &= values >= lo
+                    if hi is not None:
+                        mask &= values <= hi
+                    indices = np.flatnonzero(mask)
+                else:
+                    indices = []
+                    for value in np.atleast_1d(key):
+                        match = np.flatnonzero(values == value)
+                        if match.size == 0:
+                            raise KeyError(f"Value {value} not found in coordinate '{dim}'.")
+                        indices.append(match[0])
+            selection[dim] = _as_selector(indices, size)
+    return selection
+
+
+def _axes_plan(dims, shape, dim_name, selection, run=None):
+    """
+    变量各维度上的 (源选择, 输出起始位置)：合并维度取 run 对应的区间并写到 run 的输出位置，
+    被选择的维度取选择结果，其余维度取全部
+    """
+    axes = []
+    for dim, size in zip(dims, shape):
+        if dim == dim_name and run is not None:
+            local_start, out_start, length = run
+            axes.append((range(local_start, local_start + length), out_start))
+        else:
+            axes.append((selection.get(dim, range(size)), 0))
+    return axes
+
+
+def _slab_indices(axes, slab):
+    """由各维度的选择和第一个维度上的切片（按输出位置计）得到源变量和输出变量中的索引"""
+    if not axes:
+        return ..., ...
+    src_index, dst_index = [], []
+    for axis, (selector, dst_start) in enumerate(axes):
+        start, stop = (slab.start, slab.stop) if axis == 0 else (0, len(selector))
+        part = selector[start:stop]
+        src_index.append(slice(part.start, part.stop, part.step) if isinstance(part, range) else part)
+        dst_index.append(slice(dst_start + start, dst_start + stop))
+    return tuple(src_index), tuple(dst_index)
+
+
+def _iter_selection(var, dim_name, selection, chunk_budget_mb, run=None, itemsize=None):
+    """按内存预算逐切片产出 (源索引, 输出索引)，只覆盖选择范围内的数据"""
+    axes = _axes_plan(var.dimensions, var.shape, dim_name, selection, run)
+    if itemsize is None:
+        itemsize = var.dtype.itemsize if isinstance(var.dtype, np.dtype) else 8
+    for slab in _iter_slabs([len(selector) for selector, _ in axes], itemsize, chunk_budget_mb):
+        yield _slab_indices(axes, slab)
+
+
+def _recode_raw(raw, src_attrs, dst_var):
+    """
+    处理未打包变量的原始值：填充值不同时改写为输出文件的填充值；
+    时间变量（units 含 since）的单位或历法不同时，按输出文件的单位重新编码
+    """
+    src_fill = src_attrs.get("_FillValue", None)
+    dst_fill = getattr(dst_var, "_FillValue", None)
+    if src_fill is not None and dst_fill is not None and src_fill != dst_fill:
+        raw = np.where(raw == src_fill, dst_fill, raw)
+
+    src_units, dst_units = src_attrs.get("units", None), getattr(dst_var, "units", None)
+    src_calendar = src_attrs.get("calendar", "standard")
+    if isinstance(src_units, str) and " since " in src_units and (src_units, src_calendar) != (dst_units, getattr(dst_var, "calendar", "standard")):
+        import cftime
+
+        dates = cftime.num2date(raw, src_units, src_calendar)
+        raw = _encode_append_coord(np.asarray(dates, dtype=object), dst_var)
+    return raw
+
+
+def _file_min_max(file, packed_vars, chunk_budget_mb, dim_name=None, selection=None):
+    """逐切片求单个文件中各打包变量（选择范围内）解码后的 min/max"""
+    ranges = {}
+    with nc.Dataset(file) as ds:
+        for var in packed_vars:
+            if not selection:
+                ranges[var] = _streaming_min_max(ds.variables[var], None, chunk_budget_mb)
+                continue
+            data_min, data_max = None, None
+            for src_index, _ in _iter_selection(ds.variables[var], dim_name, selection, chunk_budget_mb, itemsize=8):
+                slab_min, slab_max = _finite_min_max(_load_slab(ds.variables[var], src_index))
+                if slab_min is not None:
+                    data_min = slab_min if data_min is None else min(data_min, slab_min)
+                    data_max = slab_max if data_max is None else max(data_max, slab_max)
+            ranges[var] = (data_min, data_max)
+    return ranges
+
+
+def _merged_pack_params(file_list, packed_vars, dtypes, chunk_budget_mb, executor=None, max_in_flight=1, dim_name=None, selection=None):
+    """
+    求打包变量解码后的整体 min/max，并按输出类型 dtypes 重新计算 scale_factor/add_offset，
+    各输入文件的打包参数可能不同，直接复制原始整数会导致溢出。返回 {变量名: (scale, offset, dtype)}
+    """
+    ranges = {var: (None, None) for var in packed_vars}
+    if packed_vars:
+        for file_ranges in _ordered_map(executor, _file_min_max, [(file, packed_vars, chunk_budget_mb, dim_name, selection) for file in file_list], max_in_flight):
+            for var, (file_min, file_max) in file_ranges.items():
+                cur_min, cur_max = ranges[var]
+                if file_min is not None:
+                    cur_min = file_min if cur_min is None else min(cur_min, file_min)
+                    cur_max = file_max if cur_max is None else max(cur_max, file_max)
+                ranges[var] = (cur_min, cur_max)
+
+    params = {}
+    for var, (data_min, data_max) in ranges.items():
+        dtype = np.dtype(dtypes[var]).name
+        scale, offset = _scale_offset_from_min_max(data_min, data_max, dtype)
+        params[var] = (float(scale), float(offset), dtype)
+    return params
+
+
+def _set_pack_attrs(dst, pack_params):
+    """把重新计算的打包参数写入输出变量的属性"""
+    for var, (scale, offset, _) in pack_params.items():
+        dst.variables[var].scale_factor = scale
+        dst.variables[var].add_offset = offset
+
+
+def _read_file_slabs(file, pieces, dim_name, pack_params, chunk_budget_mb, selection=None, decode_vars=()):
+    """
+    逐切片读取一个输入文件中沿合并维度的变量，依次产出 (变量名, 输出位置, 数据, 类型)。
+    pieces 为 [(变量名, (文件内起始位置, 输出起始位置, 长度))]，每段在合并维度上连续；
+    selection 中的维度只读取被选择的部分（超平面读取），不读取、不解压其余数据。
+    类型为 "packed" 时数据已按本文件参数解码、再按合并后的参数重新打包；
+    为 "decoded" 时是本文件中打包、但输出中未打包的变量，已解码为浮点数（缺测为 NaN）；其余为原始值 "raw"
+    """
+    with nc.Dataset(file) as src:
+        src.set_auto_maskandscale(False)
+        for var, run in pieces:
+            src_var = src.variables[var]
+            kind = "packed" if var in pack_params else "decoded" if var in decode_vars else "raw"
+            src_var.set_auto_maskandscale(kind != "raw")
+            for src_index, dst_index in _iter_selection(src_var, dim_name, selection or {}, chunk_budget_mb, run, 8 if kind != "raw" else None):
+                if kind == "packed":
+                    scale, add_offset, dtype = pack_params[var]
+                    arr = np.asarray(_load_slab(src_var, src_index), dtype=np.float64)
+                    data, _ = _data_to_scale_offset(arr, scale, add_offset, dtype)
+                elif kind == "decoded":
+                    data = _load_slab(src_var, src_index)
+                else:
+                    data = src_var[src_index]
+                yield var, dst_index, data, kind
+
+
+def _read_file_unit(*args):
+    """在子进程中读取一个工作单元（见 _file_units）的全部切片，返回列表以便跨进程传递"""
+    return list(_read_file_slabs(*args))
+
+
+def _file_units(header, var_names, dim_name, runs, selection, chunk_budget_mb):
+    """
+    把一个输入文件的读取拆成工作单元：按文件头中的形状把各变量的 runs 切成较短的段，
+    再把相邻的段合并为读出数据不超过 chunk_budget_mb 的单元（单条记录超出预算时单独成为一个单元）。
+    返回 [[(变量名, run), ...], ...]，在途的单元数有上限时内存与输入文件的大小无关
+    """
+    budget = max(1, int(chunk_budget_mb * 1024 * 1024))
+    units, current, current_bytes = [], [], 0
+    for var in var_names:
+        var_header = header["vars"][var]
+        itemsize = max(var_header["dtype"].itemsize, 8) if isinstance(var_header["dtype"], np.dtype) else 8
+        record_bytes = itemsize
+        for dim, size in zip(var_header["dims"], var_header["shape"]):
+            if dim != dim_name:
+                record_bytes *= len(selection.get(dim, range(size))) if selection else size
+        step = max(1, budget // max(record_bytes, 1))
+        for local_start, out_start, length in runs:
+            for offset in range(0, length, step):
+                n = min(step, length - offset)
+                if current and current_bytes + n * record_bytes > budget:
+                    units.append(current)
+                    current, current_bytes = [], 0
+                current.append((var, (local_start + offset, out_start + offset, n)))
+                current_bytes += n * record_bytes
+    if current:
+        units.append(current)
+    return units
+
+
+def _write_slabs(dst, slabs, header):
+    """把 _read_file_slabs 读出的切片（列表或生成器）写入输出文件，header 为该输入文件的文件头"""
+    for var, dst_index, data, kind in slabs:
+        dst_var = dst.variables[var]
+        if kind == "raw":
+            data = _recode_raw(data, header["vars"][var]["attrs"], dst_var)
+        elif kind == "decoded" and "_FillValue" in dst_var.ncattrs() and not np.isnan(dst_var._FillValue):
+            data = np.where(np.isnan(data), dst_var._FillValue, data)
+        dst_var[dst_index] = data
+
+
+def _copy_static_vars(dst, file, var_names, dim_name, selection, chunk_budget_mb):
+    """不沿合并维度的变量直接从一个输入文件复制"""
+    with nc.Dataset(file) as src:
+        src.set_auto_maskandscale(False)
+        for var in var_names:
+            for src_index, dst_index in _iter_selection(src.variables[var], dim_name, selection, chunk_budget_mb):
+                dst.variables[var][dst_index] = src.variables[var][src_index]
+
+
+def _decode_vars(header, header0, merge_vars):
+    """本文件中打包、而输出（第一个文件）中未打包的变量需要解码后写出"""
+    return [v for v in merge_vars if _is_packed(header["vars"][v]) and not _is_packed(header0["vars"][v])]
+
+
+def _dim_values(header, ref_attrs, dim_name):
+    """
+    文件头中合并维度坐标的原始值；时间坐标按参考单位/历法换算，使不同文件的值可以直接比较
+    """
+    values = header["dim_values"]
+    if values is None:
+        raise ValueError(f"Coordinate variable '{dim_name}' not found in {header['file']}, cannot sort or deduplicate.")
+    values = np.asarray(values)
+    attrs = header["vars"][dim_name]["attrs"]
+    units, calendar = attrs.get("units"), attrs.get("calendar", "standard")
+    ref_units, ref_calendar = ref_attrs.get("units"), ref_attrs.get("calendar", "standard")
+    if isinstance(units, str) and " since " in units and (units, calendar) != (ref_units, ref_calendar):
+        import cftime
+
+        values = np.asarray(cftime.date2num(cftime.num2date(values, units, calendar), ref_units, ref_calendar))
+    return values.astype(np.float64)
+
+
+def _plan_records(headers, dim_name, sort, duplicates):
+    """
+    只根据文件头中的坐标值规划输出记录：可按坐标排序（同值按文件顺序），并按 duplicates 策略
+    （"first" 保留文件列表中先出现的记录，"last" 保留后出现的记录）去掉重复的坐标值。
+    返回每个文件的 runs [(文件内起始位置, 输出起始位置, 长度)]、输出坐标值以及被丢弃的重复记录数
+    """
+    ref_attrs = headers[0]["vars"][dim_name]["attrs"] if dim_name in headers[0]["vars"] else {}
+    values = [_dim_values(h, ref_attrs, dim_name) for h in headers]
+    all_values = np.concatenate(values)
+    file_idx = np.concatenate([np.full(len(v), i) for i, v in enumerate(values)])
+    local_idx = np.concatenate([np.arange(len(v)) for v in values])
+
+    order = np.arange(all_values.size)
+    n_dropped = 0
+    if duplicates is not None:
+        if duplicates not in ("first", "last"):
+            raise ValueError(f"duplicates must be 'first', 'last' or None, got {duplicates!r}")
+        candidates = order if duplicates == "first" else order[::-1]
+        _, keep = np.unique(all_values[candidates], return_index=True)
+        order = np.sort(candidates[keep])
+        n_dropped = all_values.size - order.size
+    if sort:
+        order = order[np.argsort(all_values[order], kind="stable")]
+
+    runs = [[] for _ in headers]
+    for group in (np.split(np.arange(order.size), np.flatnonzero((np.diff(file_idx[order]) != 0) | (np.diff(local_idx[order]) != 1)) + 1)):
+        if group.size == 0:
+            continue
+        first = order[group[0]]
+        runs[file_idx[first]].append((int(local_idx[first]), int(group[0]), int(group.size)))
+    return runs, all_values[order], n_dropped
+
+
+def _report_time_axis(values, ref_attrs, n_dropped):
+    """检查合并后的坐标是否单调递增，并报告丢弃的重复记录和明显的缺口（间隔超过中位步长的 1.5 倍）"""
+    def _fmt(v):
+        units = ref_attrs.get("units")
+        if isinstance(units, str) and " since " in units:
+            import cftime
+
+            return str(cftime.num2date(v, units, ref_attrs.get("calendar", "standard")))
+        return f"{v:g}"
+
+    if n_dropped:
+        logging.warning(f"Dropped {n_dropped} duplicate records along the merge dimension.")
+    if values.size < 2:
+        return
+    steps = np.diff(values)
+    if np.any(steps <= 0):
+        logging.warning("The merged coordinate is not monotonically increasing; use sort=True and duplicates='first'/'last' to fix it.")
+        return
+    step = np.median(steps)
+    for i in np.flatnonzero(steps > 1.5 * step):
+        logging.warning(f"Gap in merged coordinate: {_fmt(values[i])} -> {_fmt(values[i + 1])} ({int(round(steps[i] / step)) - 1} missing steps)")
+
+
+def _ordered_map(executor, func, args_list, max_in_flight=1):
+    """
+    按提交顺序依次产出 func(*args) 的结果；有进程池时提前提交后续任务，
+    但同时在途的任务数不超过 max_in_flight，以限制尚未写出的数据占用的内存
+    """
+    if executor is None:
+        for args in args_list:
+            yield func(*args)
+        return
+    pending = deque()
+    for args in args_list:
+        pending.append(executor.submit(func, *args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _plan_merge(headers, var_names, dim_name, sort=False, duplicates=None):
+    """
+    根据文件头确定输出变量和每个文件的 runs [(文件内起始位置, 输出起始位置, 长度)]，
+    返回 (变量名, runs, 输出长度, 输出坐标值或 None, 丢弃的重复记录数)
+    """
+    var_names = _select_vars(headers[0], var_names)
+    lengths = _check_headers(headers, var_names, dim_name)
+    if sort or duplicates is not None:
+        runs, out_values, n_dropped = _plan_records(headers, dim_name, sort, duplicates)
+        return var_names, runs, int(out_values.size), out_values, n_dropped
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int)
+    runs = [[(0, int(offset), int(length))] for offset, length in zip(offsets, lengths)]
+    out_values = None
+    if all(h["dim_values"] is not None for h in headers):
+        out_values = np.concatenate([_dim_values(h, headers[0]["vars"][dim_name]["attrs"], dim_name) for h in headers])
+    return var_names, runs, int(sum(lengths)), out_values, 0
+
+
+def _write_merge_index(file_list: List[str], var_names: Optional[List[str]], dim_name: str, index_file: str, workers: Optional[int] = None, sort: bool = False, duplicates: Optional[str] = None, isel: Optional[dict] = None, sel: Optional[dict] = None) -> None:
+    """
+    虚拟合并：只扫描文件头，把每个输入文件在合并维度上的 runs 以及其余维度上的选择写入 JSON 索引文件，不复制任何数据。
+    索引由 open_merged_nc 读回，在原始文件上惰性拼接出合并后的数据集
+    """
+    import json
+
+    if dim_name is None:
+        raise ValueError("dim_name is required for virtual merge.")
+
+    executor = None
+    if workers is not None and workers > 1 and len(file_list) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(file_list)), mp_context=mp.get_context("spawn"))
+    try:
+        headers = _scan_headers(file_list, dim_name, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    var_names, runs, total_length, out_values, n_dropped = _plan_merge(headers, var_names, dim_name, sort, duplicates)
+    selection = _normalize_selection(file_list[0], dim_name, isel, sel)
+    index = {
+        "format": "oafuncs-merge-index",
+        "version": 1,
+        "dim": dim_name,
+        "length": total_length,
+        "variables": var_names,
+        "isel": {dim: [int(i) for i in selector] for dim, selector in selection.items()},
+        "files": [],
+    }
+    for file, file_runs in zip(file_list, runs):
+        if not file_runs:
+            continue
+        stat = os.stat(file)
+        index["files"].append({"path": os.path.abspath(file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "runs": [list(run) for run in file_runs]})
+
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+
+    if out_values is not None:
+        _report_time_axis(out_values, headers[0]["vars"][dim_name]["attrs"], n_dropped)
+
+
+def open_merged_nc(index_file: str, chunks: Optional[dict] = None) -> xr.Dataset:
+    """
+    读取 _write_merge_index 写出的索引，在原始文件上按 runs 惰性拼接出合并后的数据集（基于 dask，不复制数据）。
+    原始文件的大小或修改时间与建索引时不同时给出警告
+    """
+    import json
+
+    with open(index_file, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("format") != "oafuncs-merge-index":
+        raise ValueError(f"{index_file} is not a merge index written by oa_nc.merge(..., virtual=True).")
+
+    dim_name = index["dim"]
+    pieces = []
+    for entry in index["files"]:
+        stat = os.stat(entry["path"])
+        if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+            logging.warning(f"{entry['path']} has changed since the merge index was written.")
+        ds = xr.open_dataset(entry["path"], chunks={} if chunks is None else chunks)[index["variables"]]
+        if index.get("isel"):
+            ds = ds.isel(index["isel"])
+        for local_start, out_start, length in entry["runs"]:
+            pieces.append((out_start, ds.isel({dim_name: slice(local_start, local_start + length)})))
+    pieces.sort(key=lambda piece: piece[0])
+    return xr.concat([piece for _, piece in pieces], dim=dim_name, data_vars="minimal", coords="minimal", compat="override", join="override", combine_attrs="override")
+
+
+def _plan_signature(file_list, var_names, dim_name, runs, selection):
+    """合并计划的指纹（输入文件及其大小/修改时间、变量、runs 和选择），检查点只在指纹一致时才会被续用"""
+    import hashlib
+    import json
+
+    files = []
+    for file in file_list:
+        stat = os.stat(file)
+        files.append([os.path.abspath(file), stat.st_size, stat.st_mtime_ns])
+    plan = {"files": files, "vars": var_names, "dim": dim_name, "runs": runs, "selection": {d: [int(i) for i in sel] for d, sel in selection.items()}}
+    return hashlib.sha1(json.dumps(plan, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _load_checkpoint(checkpoint_file, signature):
+    """读取检查点，文件不存在、损坏或指纹不一致时返回 None"""
+    import json
+
+    if not os.path.exists(checkpoint_file):
+        return None
+    try:
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("signature") == signature else None
+
+
+def _save_checkpoint(checkpoint_file, state):
+    """先写临时文件再原子替换，保证检查点本身不会写坏"""
+    import json
+
+    tmp_file = checkpoint_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def _merge_nc_streaming(file_list: List[str], var_names: Optional[List[str]], dim_name: str, target_filename: str, chunk_budget_mb: float = 256, workers: Optional[int] = None, sort: bool = False, duplicates: Optional[str] = None, isel: Optional[dict] = None, sel: Optional[dict] = None, resume: bool = True) -> None:
+    """
+    流式合并：先读取各文件头得到合并维度长度，用 netCDF4 预先定义完整的输出变量，
+    再按文件顺序把各输入文件的数据写入其在合并维度上的偏移位置。不沿合并维度的变量只从第一个文件复制一次。
+    sort/duplicates 只根据文件头中的坐标值规划每条记录的输出位置（见 _plan_records），不需要额外读取数据；
+    写出后检查坐标的单调性并报告缺口。
+    isel/sel 在其余维度上的选择直接下推为对源文件的超平面读取，读取和解压的数据量只与选择范围有关。
+
+    workers 大于 1 时，文件头扫描、打包变量的范围统计和各文件的读取/解码都在进程池中并行进行，
+    主进程作为唯一的写入者按文件顺序写出。读取按 _file_units 拆成不超过 chunk_budget_mb 的工作单元，
+    在途的单元数不超过 2 * workers，峰值内存约为 2 * workers * chunk_budget_mb，与输入文件的大小无关。
+    netCDF-C/HDF5 不是线程安全的，因此并行读取使用进程而不是线程。
+
+    数据先写入 target_filename + ".part"，每写完一个输入文件就同步到磁盘并在 ".part.json" 检查点中记录；
+    全部完成后原子替换为目标文件，已有的目标文件在此之前保持不变。resume 为 True 且检查点与当前合并计划一致时，
+    从上次完成的输入文件之后继续写（未完成的那个文件会整体重写）。
+    """
+    if dim_name is None:
+        raise ValueError("dim_name is required for streaming merge.")
+
+    executor = None
+    if workers is not None and workers > 1 and len(file_list) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(file_list)), mp_context=mp.get_context("spawn"))
+    max_in_flight = 2 * workers if executor is not None else 1
+
+    try:
+        headers = _scan_headers(file_list, dim_name, executor)
+        var_names, runs, total_length, out_values, n_dropped = _plan_merge(headers, var_names, dim_name, sort, duplicates)
+        selection = _normalize_selection(file_list[0], dim_name, isel, sel)
+
+        header0 = headers[0]
+        merge_vars = [v for v in var_names if dim_name in header0["vars"][v]["dims"]]
+        static_vars = [v for v in var_names if v not in merge_vars]
+        packed_vars = [v for v in merge_vars if _is_packed(header0["vars"][v])]
+        # 所有输入的打包编码完全相同的变量直接复制整数原始值，不解码也不重新量化；只有编码不同的变量才需要重新打包
+        repack_vars = [v for v in packed_vars if any(_packing_key(h["vars"][v]) != _packing_key(header0["vars"][v]) for h in headers[1:])]
+        if packed_vars:
+            logging.info(f"Packed variables copied as raw integers: {[v for v in packed_vars if v not in repack_vars]}, re-packed: {repack_vars}")
+
+        part_file = target_filename + ".part"
+        checkpoint_file = part_file + ".json"
+        signature = _plan_signature(file_list, var_names, dim_name, runs, selection)
+        state = _load_checkpoint(checkpoint_file, signature) if resume else None
+
+        dst = None
+        if state is not None and os.path.exists(part_file):
+            try:
+                dst = nc.Dataset(part_file, "a")
+                dst.set_auto_maskandscale(False)
+                pack_params = {var: tuple(params) for var, params in state["pack_params"].items()}
+                logging.info(f"Resuming merge into {target_filename}: {len(state['done'])} of {len(file_list)} input files already written.")
+            except Exception as e:
+                logging.warning(f"Cannot reopen {part_file} ({e}), starting the merge from scratch.")
+                dst = None
+
+        if dst is None:
+            for file in (part_file, checkpoint_file):
+                if os.path.exists(file):
+                    os.remove(file)
+            pack_params = _merged_pack_params(file_list, repack_vars, {v: header0["vars"][v]["dtype"] for v in repack_vars}, chunk_budget_mb, executor, max_in_flight, dim_name, selection)
+            dst = nc.Dataset(part_file, "w", format="NETCDF4")
+            _define_output(dst, header0, var_names, dim_name, total_length, selection, pack_params)
+
+            _copy_static_vars(dst, file_list[0], static_vars, dim_name, selection, chunk_budget_mb)
+            _set_pack_attrs(dst, pack_params)
+            dst.sync()
+            state = {"signature": signature, "pack_params": pack_params, "done": []}
+            _save_checkpoint(checkpoint_file, state)
+
+        try:
+            done = set(state["done"])
+            # 每个工作单元记录所属文件以及是否为该文件的最后一个单元，写完一个文件的所有单元后记录检查点
+            owners, tasks = [], []
+            for i, (file, header, file_runs) in enumerate(zip(file_list, headers, runs)):
+                if file_runs and i not in done:
+                    units = _file_units(header, merge_vars, dim_name, file_runs, selection, chunk_budget_mb) or [[]]
+                    decode_vars = _decode_vars(header, header0, merge_vars)
+                    for k, unit in enumerate(units):
+                        owners.append((i, k == len(units) - 1))
+                        tasks.append((file, unit, dim_name, pack_params, chunk_budget_mb, selection, decode_vars))
+            results = _ordered_map(executor, _read_file_unit, tasks, max_in_flight)
+            for (i, last), slabs in pbar(zip(owners, results), "Merging files", total=len(tasks)):
+                _write_slabs(dst, slabs, headers[i])
+                if last:
+                    dst.sync()
+                    state["done"].append(i)
+                    _save_checkpoint(checkpoint_file, state)
+        finally:
+            dst.close()
+
+        if os.path.exists(target_filename):
+            logging.warning("The target file already exists. Replacing it ...")
+        os.replace(part_file, target_filename)
+        os.remove(checkpoint_file)
+
+        if out_values is not None:
+            _report_time_axis(out_values, header0["vars"][dim_name]["attrs"], n_dropped)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _tree_groups(runs, group_size):
+    """
+    把输出沿合并维度切成连续的段，每段涉及的输入文件不超过 group_size 个。
+    runs 恰好覆盖整个输出，按输出位置依次累积即可；返回 [(段起点, 段长度, {文件序号: 段内 runs})]
+    """
+    all_runs = sorted((dst_start, i, src_start, length) for i, file_runs in enumerate(runs) for src_start, dst_start, length in file_runs)
+    groups, current, files = [], [], set()
+    for run in all_runs:
+        if run[1] not in files and len(files) >= group_size:
+            groups.append(current)
+            current, files = [], set()
+        current.append(run)
+        files.add(run[1])
+    if current:
+        groups.append(current)
+
+    result = []
+    for group in groups:
+        start = group[0][0]
+        local_runs = {}
+        for dst_start, i, src_start, length in group:
+            local_runs.setdefault(i, []).append((src_start, dst_start - start, length))
+        result.append((start, sum(r[3] for r in group), dict(sorted(local_runs.items()))))
+    return result
+
+
+def _merge_group(out_file, file_list, headers, runs, header0, var_names, dim_name, total_length, selection, pack_params, chunk_budget_mb, static_file=None):
+    """
+    在子进程中把一组输入文件按 runs 合并为一个中间文件。输出按 header0（全体输入的第一个文件）定义，
+    打包变量使用全局统一的 pack_params，因此各中间文件的编码完全相同；static_file 不为 None 时复制非合并维度变量
+    """
+    merge_vars = [v for v in var_names if dim_name in header0["vars"][v]["dims"]]
+    with nc.Dataset(out_file, "w", format="NETCDF4") as dst:
+        _define_output(dst, header0, var_names, dim_name, total_length, selection, pack_params)
+        if static_file is not None:
+            _copy_static_vars(dst, static_file, [v for v in var_names if v not in merge_vars], dim_name, selection, chunk_budget_mb)
+        _set_pack_attrs(dst, pack_params)
+        for file, header, file_runs in zip(file_list, headers, runs):
+            pieces = [(var, run) for var in merge_vars for run in file_runs]
+            _write_slabs(dst, _read_file_slabs(file, pieces, dim_name, pack_params, chunk_budget_mb, selection, _decode_vars(header, header0, merge_vars)), header)
+    return out_file
+
+
+def _merge_nc_tree(file_list: List[str], var_names: Optional[List[str]], dim_name: str, target_filename: str, chunk_budget_mb: float = 256, workers: Optional[int] = None, group_size: int = 64, sort: bool = False, duplicates: Optional[str] = None, isel: Optional[dict] = None, sel: Optional[dict] = None, resume: bool = True) -> None:
+    """
+    树形合并：进程池中每个进程把一组（不超过 group_size 个）输入文件合并为一个中间文件，中间文件再逐层分组合并，
+    直到不超过 group_size 个，最后由流式合并写出目标文件。每个进程一次只持有一个输入文件的数据。
+
+    合并计划（sort/duplicates、isel/sel）和打包参数在第一层之前按全体输入统一确定，分组按输出位置切成连续的段，
+    因此各中间文件的编码完全相同，之后各层都是整数原始值的直接复制，不会重复量化。
+    中间文件放在目标文件所在目录下的临时目录中，结束后删除。
+    """
+    import shutil
+    import tempfile
+
+    if dim_name is None:
+        raise ValueError("dim_name is required for streaming merge.")
+    if group_size < 2:
+        raise ValueError(f"group_size must be at least 2, got {group_size}")
+    if len(file_list) <= group_size:
+        _merge_nc_streaming(file_list, var_names, dim_name, target_filename, chunk_budget_mb, workers, sort, duplicates, isel, sel, resume)
+        return
+
+    n_workers = workers if workers is not None and workers > 1 else 1
+    # 第一层至少分成 n_workers 组，保证所有进程都有任务；之后各层仍按 group_size 分组
+    first_group_size = max(2, min(group_size, -(-len(file_list) // n_workers)))
+    if first_group_size < group_size:
+        logging.info(f"Tree merge: the first level uses groups of {first_group_size} files so that all {n_workers} workers get a group.")
+    executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn")) if n_workers > 1 else None
+    tmp_dir = tempfile.mkdtemp(prefix=".merge_tree_", dir=os.path.dirname(os.path.abspath(target_filename)))
+    try:
+        headers = _scan_headers(file_list, dim_name, executor)
+        var_names, runs, _, _, n_dropped = _plan_merge(headers, var_names, dim_name, sort, duplicates)
+        selection = _normalize_selection(file_list[0], dim_name, isel, sel)
+        header0 = headers[0]
+        packed_vars = [v for v in var_names if dim_name in header0["vars"][v]["dims"] and _is_packed(header0["vars"][v])]
+        repack_vars = [v for v in packed_vars if any(_packing_key(h["vars"][v]) != _packing_key(header0["vars"][v]) for h in headers[1:])]
+        pack_params = _merged_pack_params(file_list, repack_vars, {v: header0["vars"][v]["dtype"] for v in repack_vars}, chunk_budget_mb, executor, 2 * n_workers, dim_name, selection)
+        if n_dropped:
+            logging.warning(f"Dropped {n_dropped} duplicate records along the merge dimension.")
+
+        level = 0
+        while len(file_list) > group_size:
+            tasks = []
+            for g, (start, length, group_runs) in enumerate(_tree_groups(runs, first_group_size if level == 0 else group_size)):
+                out_file = os.path.join(tmp_dir, f"level{level}_{g:06d}.nc")
+                idx = list(group_runs)
+                tasks.append((out_file, [file_list[i] for i in idx], [headers[i] for i in idx], [group_runs[i] for i in idx], header0, var_names, dim_name, length, selection, pack_params, chunk_budget_mb, file_list[0] if start == 0 else None))
+            if executor is not None:
+                futures = [executor.submit(_merge_group, *task) for task in tasks]
+                intermediates = [future.result() for future in pbar(futures, f"Tree merge level {level}")]
+            else:
+                intermediates = [_merge_group(*task) for task in pbar(tasks, f"Tree merge level {level}")]
+            if level > 0:
+                for file in file_list:
+                    os.remove(file)
+
+            # 之后各层：中间文件已完成选择和排序，编码相同，按顺序首尾相接即可
+            file_list = intermediates
+            headers = _scan_headers(file_list, dim_name, executor)
+            header0 = headers[0]
+            var_names, runs, _, _, _ = _plan_merge(headers, None, dim_name)
+            selection, pack_params = {}, {}
+            level += 1
+
+        if executor is not None:
+            executor.shutdown()
+            executor = None
+        _merge_nc_streaming(file_list, None, dim_name, target_filename, chunk_budget_mb, workers, resume=False)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, List[str]]] = None, dim_name: Optional[str] = None, target_filename: Optional[str] = None, streaming: bool = False, chunk_budget_mb: float = 256, workers: Optional[int] = None, sort: bool = False, duplicates: Optional[str] = None, virtual: bool = False, isel: Optional[dict] = None, sel: Optional[dict] = None, resume: bool = True, group_size: Optional[int] = None) -> None:
     """
     Description:
         Merge variables from multiple NetCDF files along a specified dimension and write to a new file.
@@ -19,15 +860,29 @@ def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, Lis
         var_name: Name of the variable to be extracted or a list of variable names, default is None, which means all variables are extracted
         dim_name: Dimension name used for merging
         target_filename: Target file name after merging
+        streaming: Preallocate the output with netCDF4 and copy the inputs one file at a time, slab by slab, instead of concatenating everything in memory
+        chunk_budget_mb: Memory budget (MB) of one slab in streaming mode
+        workers: Number of processes scanning headers and reading inputs in streaming mode, a single writer keeps the file order
+        sort: Order the records by the merge coordinate read from the file headers (implies streaming)
+        duplicates: Drop records with repeated merge coordinate values, keeping the 'first' or 'last' occurrence in file_list order (implies streaming)
+        virtual: Write only a JSON index (file, offset and length of every run along dim_name) to target_filename, to be opened lazily with open_merged_nc
+        isel: Index selection on the other dimensions, e.g. {'lat': slice(100, 200), 'depth': 0}, read as hyperslabs from every input (implies streaming)
+        sel: Coordinate selection on the other dimensions, e.g. {'lon': slice(100, 130), 'depth': [0, 10]}, resolved on the first file (implies streaming)
+        group_size: Merge as a tree: a process pool (workers) merges groups of at most group_size files into intermediate files, which are merged level by level; for very large file counts (implies streaming)
+        resume: In streaming mode, continue an interrupted merge of the same inputs from its checkpoint (target_filename + '.part.json') instead of starting over
 
     Example:
         merge(file_list, var_name='u', dim_name='time', target_filename='merged.nc')
         merge(file_list, var_name=['u', 'v'], dim_name='time', target_filename='merged.nc')
         merge(file_list, var_name=None, dim_name='time', target_filename='merged.nc')
+        merge(file_list, var_name=None, dim_name='time', target_filename='merged.nc', streaming=True)
+        merge(file_list, var_name=None, dim_name='time', target_filename='merged.nc', sort=True, duplicates='last')
+        merge(file_list, var_name='u', dim_name='time', target_filename='box.nc', sel={'lat': slice(10, 30), 'lon': slice(100, 130)})
+        merge(file_list, var_name=None, dim_name='time', target_filename='merged.nc', workers=16, group_size=64)
     """
 
     if target_filename is None:
-        target_filename = "merged.nc"
+        target_filename = "merged.json" if virtual else "merged.nc"
 
     # 确保目标路径存在
     target_dir = os.path.dirname(target_filename)
@@ -37,6 +892,18 @@ def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, Lis
     if isinstance(file_list, str):
         file_list = [file_list]
 
+    if virtual:
+        _write_merge_index(file_list, [var_name] if isinstance(var_name, str) else var_name, dim_name, target_filename, workers, sort, duplicates, isel, sel)
+        return
+
+    if group_size is not None:
+        _merge_nc_tree(file_list, [var_name] if isinstance(var_name, str) else var_name, dim_name, target_filename, chunk_budget_mb, workers, group_size, sort, duplicates, isel, sel, resume)
+        return
+
+    if streaming or sort or duplicates is not None or isel or sel:
+        _merge_nc_streaming(file_list, [var_name] if isinstance(var_name, str) else var_name, dim_name, target_filename, chunk_budget_mb, workers, sort, duplicates, isel, sel, resume)
+        return
+
     # 初始化变量名列表
     if var_name is None:
         with xr.open_dataset(file_list[0]) as ds:
@@ -50,6 +917,8 @@ def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, Lis
 
     # 初始化合并数据字典
     merged_data = {}
+    # 各文件的打包编码，全部相同时无需重新计算 scale_factor/add_offset
+    pack_encodings = {}
 
     for i, file in pbar(enumerate(file_list), "Reading files", total=len(file_list)):
         with xr.open_dataset(file) as ds:
@@ -57,6 +926,7 @@ def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, Lis
                 data_var = ds[var]
                 if dim_name in data_var.dims:
                     merged_data.setdefault(var, []).append(data_var)
+                    pack_encodings.setdefault(var, set()).add(tuple(str(data_var.encoding.get(k)) for k in ("dtype", "scale_factor", "add_offset", "_FillValue")))
                 elif var not in merged_data:
                     # 只负责合并，不做NaN填充，统一交由 netcdf_write.py 处理
                     merged_data[var] = data_var
@@ -118,11 +988,34 @@ def merge_nc(file_list: Union[str, List[str]], var_name: Optional[Union[str, Lis
         else:
             logging.info(f"所有文件的 {dim_name} 坐标值完全一致，合并将保持原始顺序") """
 
-    if os.path.exists(target_filename):
-        logging.warning("The target file already exists. Removing it ...")
-        os.remove(target_filename)
+    # 各输入文件的 scale_factor/add_offset 可能不同，按合并后的数据范围重新计算打包参数，避免溢出
+    for var in merged_ds.data_vars:
+        encoding = merged_ds[var].encoding
+        if "scale_factor" not in encoding and "add_offset" not in encoding:
+            continue
+        if len(pack_encodings.get(var, ())) <= 1:
+            continue
+        packed_dtype = np.dtype(encoding.get("dtype", "int16")).name
+        if packed_dtype not in ["int8", "int16", "int32", "int64"]:
+            continue
+        data_min, data_max = _streaming_min_max(merged_ds[var])
+        scale, offset = _scale_offset_from_min_max(data_min, data_max, packed_dtype)
+        encoding["scale_factor"] = float(scale)
+        encoding["add_offset"] = float(offset)
 
-    merged_ds.to_netcdf(target_filename, mode="w")
+    # 先写到临时文件，成功后原子替换，写出失败时已有的目标文件保持不变
+    part_file = target_filename + ".part"
+    try:
+        merged_ds.to_netcdf(part_file, mode="w")
+    except BaseException:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+        raise
+    finally:
+        merged_ds.close()
+    if os.path.exists(target_filename):
+        logging.warning("The target file already exists. Replacing it ...")
+    os.replace(part_file, target_filename)
 
 
 # Example usage
@@ -97,3 +97,137 @@ def modify_nc(nc_file, var_name, attr_name=None, new_value=None):
     except Exception as e:
         print(f"[red]Error:[/red] An error occurred while modifying '{var_name}' in '{nc_file}'. [bold]Details:[/bold] {e}")
         return False
+
+
+def _check_value(variable, var_name, new_value):
+    """
+    Convert a new variable value to an array of the variable's shape, raising if its shape or type cannot fit.
+    """
+    new_value = np.asarray(new_value)
+    if variable.shape != new_value.shape:
+        try:
+            new_value = new_value.reshape(variable.shape)
+        except ValueError:
+            raise ValueError(f"Shape mismatch: Variable '{var_name}' has shape {variable.shape}, but new value has shape {new_value.shape}. Reshaping failed.")
+    if isinstance(variable.dtype, np.dtype) and variable.dtype.kind in "iuf" and new_value.dtype.kind not in "biuf":
+        raise TypeError(f"Type mismatch: Variable '{var_name}' is {variable.dtype}, but new value is {new_value.dtype}.")
+    return new_value
+
+
+def _check_edits(ds, edits):
+    """
+    Check every edit (names, value shapes and types, attribute types, rename collisions) before anything is written,
+    so a bad edit leaves the file untouched.
+    """
+    unknown = set(edits) - {"values", "attrs", "rename"}
+    if unknown:
+        raise ValueError(f"Unknown edit type(s) {sorted(unknown)}, expected 'values', 'attrs' or 'rename'.")
+    for var_name, new_value in edits.get("values", {}).items():
+        if var_name not in ds.variables:
+            raise ValueError(f"Variable '{var_name}' not found in the NetCDF file.")
+        _check_value(ds.variables[var_name], var_name, new_value)
+    for var_name, attrs in edits.get("attrs", {}).items():
+        if var_name is not None and var_name not in ds.variables:
+            raise ValueError(f"Variable '{var_name}' not found in the NetCDF file.")
+        for attr_name, value in attrs.items():
+            if value is not None and not isinstance(value, (str, bytes)) and np.asarray(value).dtype.kind not in "iufSU":
+                raise TypeError(f"Attribute '{attr_name}' has unsupported type {type(value).__name__}.")
+    renames = edits.get("rename", {})
+    for old_name, new_name in renames.items():
+        if old_name not in ds.variables and old_name not in ds.dimensions:
+            raise ValueError(f"Variable or dimension '{old_name}' not found in the NetCDF file.")
+        if new_name == old_name:
+            continue
+        if old_name in ds.variables and new_name in ds.variables:
+            raise ValueError(f"Variable name '{new_name}' already exists in the file.")
+        if old_name in ds.dimensions and new_name in ds.dimensions:
+            raise ValueError(f"Dimension name '{new_name}' already exists in the file.")
+    new_names = list(renames.values())
+    duplicated = sorted({name for name in new_names if new_names.count(name) > 1})
+    if duplicated:
+        raise ValueError(f"Several variables or dimensions would be renamed to {duplicated}.")
+
+
+def _apply_edits(ds, edits):
+    """
+    Apply variable values, then attributes, then renames to an open dataset.
+    Names always refer to the names before renaming.
+    """
+    for var_name, new_value in edits.get("values", {}).items():
+        variable = ds.variables[var_name]
+        variable[:] = _check_value(variable, var_name, new_value)
+
+    for var_name, attrs in edits.get("attrs", {}).items():
+        target = ds if var_name is None else ds.variables[var_name]
+        for attr_name, value in attrs.items():
+            if value is None:
+                if attr_name in target.ncattrs():
+                    target.delncattr(attr_name)
+            else:
+                target.setncattr(attr_name, value)
+
+    for old_name, new_name in edits.get("rename", {}).items():
+        if old_name in ds.variables:
+            ds.renameVariable(old_name, new_name)
+        if old_name in ds.dimensions:
+            ds.renameDimension(old_name, new_name)
+
+
+def _edit_file(nc_file_path, edits):
+    """
+    Check the whole batch, then apply it, in a single 'r+' session. Checking only reads, so a rejected batch leaves the file unchanged.
+    Returns None on success or the error message.
+    """
+    try:
+        with nc.Dataset(nc_file_path, "r+") as ds:
+            _check_edits(ds, edits)
+            _apply_edits(ds, edits)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def edit_nc(nc_file, edits):
+    """
+    Apply many value/attribute/rename edits to a NetCDF file, opening it only once.
+    """
+    if not os.path.exists(nc_file):
+        print(f"[red]Error:[/red] NetCDF file '{nc_file}' does not exist.")
+        return False
+    error = _edit_file(nc_file, edits)
+    if error is not None:
+        print(f"[red]Error:[/red] Failed to edit '{nc_file}'. [bold]Details:[/bold] {error}")
+        return False
+    n_edits = len(edits.get("values", {})) + sum(len(attrs) for attrs in edits.get("attrs", {}).values()) + len(edits.get("rename", {}))
+    print(f"[green]Successfully applied {n_edits} edit(s) to '{nc_file}'.[/green]")
+    return True
+
+
+def edit_many_nc(pattern, edits, workers=None):
+    """
+    Apply the same edits to many NetCDF files, one 'r+' session per file, files spread over a process pool.
+    """
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+
+    from oafuncs._script.netcdf_files import collect_nc_files
+
+    files = collect_nc_files(pattern)
+    if not files:
+        print(f"[yellow]No files match {pattern}[/yellow]")
+        return {"edited": 0, "failed": 0, "files": []}
+
+    n_workers = max(1, min(workers or 1, len(files)))
+    if n_workers == 1:
+        errors = [_edit_file(file, edits) for file in files]
+    else:
+        # netCDF-C/HDF5 is not thread-safe, so files are edited in separate processes
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn")) as executor:
+            errors = list(executor.map(_edit_file, files, [edits] * len(files), chunksize=max(1, len(files) // (n_workers * 8))))
+
+    results = [{"file": file, "error": error} for file, error in zip(files, errors)]
+    failed = [r for r in results if r["error"] is not None]
+    print(f"[green]Edited {len(files) - len(failed)} of {len(files)} file(s).[/green]")
+    for r in failed:
+        print(f"[red]{r['file']}: {r['error']}[/red]")
+    return {"edited": len(files) - len(failed), "failed": len(failed), "files": results}
@@ -0,0 +1,167 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import netCDF4 as nc
+import numpy as np
+from rich import print
+
+from oafuncs._script.netcdf_write import _iter_slabs
+
+__all__ = ["unscale_nc"]
+
+# 解包后不再有意义（或在变量创建时单独设置）的属性
+_PACKING_ATTRS = ("scale_factor", "add_offset", "_FillValue", "missing_value", "_Unsigned", "valid_min", "valid_max", "valid_range")
+
+
+def _is_packed_var(ncvar) -> bool:
+    """变量是否使用了 scale_factor/add_offset 打包"""
+    attrs = ncvar.ncattrs()
+    return "scale_factor" in attrs or "add_offset" in attrs
+
+
+def _raw_dtype(ncvar):
+    """考虑 _Unsigned 约定后，原始整数数据的真实类型"""
+    dtype = ncvar.dtype
+    if getattr(ncvar, "_Unsigned", "false").lower() == "true" and np.dtype(dtype).kind == "i":
+        dtype = np.dtype(f"u{np.dtype(dtype).itemsize}")
+    return dtype
+
+
+def _unpack_slab(raw, ncvar, fill_value):
+    """
+    将一个原始打包切片解码为 float32：raw * scale_factor + add_offset，
+    _FillValue/missing_value 处写入输出的 fill_value（没有则为 NaN）
+    """
+    raw = np.asarray(raw).view(_raw_dtype(ncvar))
+    scale = np.float64(getattr(ncvar, "scale_factor", 1.0))
+    offset = np.float64(getattr(ncvar, "add_offset", 0.0))
+
+    invalid = None
+    for attr in ("_FillValue", "missing_value"):
+        if attr in ncvar.ncattrs():
+            # 属性按存储类型（有符号）保存，_Unsigned 变量需要先转换为无符号类型再比较
+            for value in np.atleast_1d(ncvar.getncattr(attr)).astype(raw.dtype):
+                mask = raw == value
+                invalid = mask if invalid is None else (invalid | mask)
+
+    out = np.multiply(raw, scale, dtype=np.float64)
+    out += offset
+    out = out.astype(np.float32)
+    if invalid is not None:
+        out[invalid] = np.nan if fill_value is None else fill_value
+    return out
+
+
+def _is_float_data_var(ncvar, coord_names) -> bool:
+    """非 float32 的浮点数据变量（不是坐标变量），与以前的 xarray 实现一样转为 float32 写出，避免文件暴涨"""
+    return ncvar.name not in coord_names and isinstance(ncvar.dtype, np.dtype) and ncvar.dtype.kind == "f" and ncvar.dtype != np.float32
+
+
+def _create_like(dst, ncvar, packed, compression_level, to_float32=False):
+    """在目标文件中按源变量创建变量：打包变量和 to_float32 的浮点变量改为 float32，其余保持原类型"""
+    kwargs = {}
+    numeric = isinstance(ncvar.dtype, np.dtype) and ncvar.dtype.kind in "iuf"
+    fill_value = None
+    if packed:
+        dtype = np.float32
+        if "_FillValue" in ncvar.ncattrs():
+            fill_value = np.float32(ncvar.getncattr("_FillValue"))
+            kwargs["fill_value"] = fill_value
+    elif to_float32:
+        dtype = np.float32
+        kwargs["fill_value"] = np.float32(ncvar.getncattr("_FillValue")) if "_FillValue" in ncvar.ncattrs() else False
+    else:
+        dtype = ncvar.datatype
+        if "_FillValue" in ncvar.ncattrs():
+            kwargs["fill_value"] = ncvar.getncattr("_FillValue")
+        else:
+            kwargs["fill_value"] = False
+
+    if numeric and ncvar.ndim > 0:
+        kwargs.update(zlib=True, complevel=compression_level)
+        chunking = ncvar.chunking()
+        if chunking != "contiguous" and chunking is not None:
+            kwargs["chunksizes"] = chunking
+
+    out = dst.createVariable(ncvar.name, dtype, ncvar.dimensions, **kwargs)
+    out.set_auto_maskandscale(False)
+    skip = _PACKING_ATTRS if packed else ("_FillValue",)
+    attrs = {k: ncvar.getncattr(k) for k in ncvar.ncattrs() if k not in skip}
+    if to_float32 and "missing_value" in attrs:
+        attrs["missing_value"] = np.float32(attrs["missing_value"])
+    out.setncatts(attrs)
+    return out, fill_value
+
+
+def _copy_var(src_var, dst_var, packed, fill_value, lock, chunk_budget_mb):
+    """
+    逐切片复制单个变量（类型不同时转换为输出变量的类型）。netCDF-C 不是线程安全的，读写都在锁内进行；
+    解码计算在锁外完成，因此多个变量可以并行解码
+    """
+    itemsize = max(src_var.dtype.itemsize, 4) if isinstance(src_var.dtype, np.dtype) else 8
+    for slab in _iter_slabs(src_var.shape, itemsize, chunk_budget_mb):
+        with lock:
+            raw = src_var[slab]
+        if packed:
+            data = _unpack_slab(raw, src_var, fill_value)
+        elif dst_var.dtype != src_var.dtype:
+            data = np.asarray(raw).astype(dst_var.dtype)
+        else:
+            data = raw
+        with lock:
+            dst_var[slab] = data
+
+
+def unscale_nc(src_path: str, dst_path: str, compression_level: int = 4, chunk_budget_mb: float = 256, workers: Optional[int] = None) -> list:
+    """
+    流式解包 NetCDF 文件：只读取文件头判断打包变量，逐变量、逐切片地应用 scale_factor/add_offset 写出 float32；
+    与以前的 xarray 实现一致，未打包的 float64 等浮点数据变量也转为 float32（坐标变量保持原类型），
+    其余变量按原类型原样复制。峰值内存只与 chunk_budget_mb 和线程数有关
+
+    参数:
+        src_path: 源文件路径
+        dst_path: 目标文件路径
+        compression_level: zlib 压缩级别
+        chunk_budget_mb: 单个切片的内存预算 (MB)
+        workers: 并行处理变量的线程数，None 表示逐个处理
+
+    返回:
+        list: 被解包的变量名
+    """
+    lock = threading.Lock()
+    with nc.Dataset(src_path, "r") as src, nc.Dataset(dst_path, "w", format="NETCDF4") as dst:
+        src.set_auto_maskandscale(False)
+        dst.setncatts({k: src.getncattr(k) for k in src.ncattrs()})
+        for name, dim in src.dimensions.items():
+            dst.createDimension(name, None if dim.isunlimited() else len(dim))
+
+        packed_vars = [name for name, var in src.variables.items() if _is_packed_var(var)]
+        print(f"[yellow]文件: {src_path} (原始大小: {os.path.getsize(src_path) / (1024 * 1024):.2f} MB)[/yellow]")
+        if packed_vars:
+            print(f"[yellow]发现 {len(packed_vars)} 个变量使用了比例因子: {', '.join(packed_vars)}[/yellow]")
+        else:
+            print("[yellow]未发现任何变量使用比例因子，解包可能不必要[/yellow]")
+
+        # 变量定义必须在写数据之前、在主线程中完成
+        # 坐标变量：与维度同名的变量以及各变量 coordinates 属性中列出的变量
+        coord_names = set(src.dimensions)
+        for var in src.variables.values():
+            coord_names.update(str(getattr(var, "coordinates", "")).split())
+        tasks = []
+        for name, var in src.variables.items():
+            packed = name in packed_vars
+            out, fill_value = _create_like(dst, var, packed, compression_level, not packed and _is_float_data_var(var, coord_names))
+            tasks.append((var, out, packed, fill_value))
+
+        if workers and workers > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_copy_var, *task, lock, chunk_budget_mb) for task in tasks]
+                for future in futures:
+                    future.result()
+        else:
+            for task in tasks:
+                _copy_var(*task, lock, chunk_budget_mb)
+
+    return packed_vars
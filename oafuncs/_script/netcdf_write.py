@@ -1,5 +1,7 @@
 import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import xarray as xr
 import netCDF4 as nc
@@ -25,6 +27,20 @@ def _get_dtype_info(dtype):
     return dtype_map[dtype]
 
 
+def _clip_bounds(dtype, work_dtype=np.float64):
+    """
+    有效数据在 work_dtype 中的截断范围 [clip_min+1, clip_max]，两端都是 work_dtype 能精确表示、且落在范围内的值。
+    int64 的界限在 float64 中会被舍入到 ±2**63，转换为整数时溢出（上界）或与填充值重合（下界），因此向内取相邻的浮点数。
+    """
+    _, clip_min, clip_max = _get_dtype_info(dtype)
+    low, high = work_dtype(clip_min + 1), work_dtype(clip_max)
+    if int(low) < clip_min + 1:
+        low = np.nextafter(low, work_dtype(np.inf))
+    if int(high) > clip_max:
+        high = np.nextafter(high, work_dtype(-np.inf))
+    return low, high
+
+
 def _numpy_to_nc_type(numpy_type):
     """将 NumPy 数据类型映射到 NetCDF 数据类型"""
     numpy_to_nc = {
@@ -43,29 +59,157 @@ def _numpy_to_nc_type(numpy_type):
     return numpy_to_nc.get(numpy_type_str, "f4")
 
 
-def _calculate_scale_and_offset(data, dtype="int32"):
+_COMPRESSION_KEYS = ("compression", "complevel", "shuffle", "chunksizes")
+_TIME_DIM_NAMES = ("time", "t", "Time", "ocean_time", "valid_time", "MT")
+
+
+def _codec_supported(codec):
+    """检查当前 netCDF-C 库是否支持指定的压缩算法"""
+    if codec in [None, "zlib"]:
+        return True
+    family = "blosc" if codec.startswith("blosc") else {"zstd": "zstandard"}.get(codec, codec)
+    return bool(getattr(nc, f"__has_{family}_support__", False))
+
+
+def _fit_tile(sizes, budget):
+    """按原有长宽比例等比缩小各维度，使其元素个数不超过 budget"""
+    total = int(np.prod(sizes, dtype=np.int64))
+    if total <= budget:
+        return list(sizes)
+    factor = (budget / total) ** (1.0 / len(sizes))
+    return [max(1, min(size, int(size * factor))) for size in sizes]
+
+
+def _auto_chunksizes(dims, shape, itemsize, policy="auto", target_mb=4):
     """
-    只对有效数据（非NaN、非无穷值、非自定义缺失值）计算scale_factor和add_offset。
-    为填充值保留最小值位置，有效数据范围为 [clip_min+1, clip_max]。
+    根据访问模式自动计算 chunk 形状，每个 chunk 约 target_mb 大小。
+      - "map": 时间（及深度等非水平维度）取 1，水平两维尽量完整，适合按时次读取整张图
+      - "timeseries": 时间维尽量完整，水平方向切成小块，适合读取单点长时间序列
+      - "auto": 平衡策略，读取一条时间序列与读取一张图所涉及的 chunk 数大致相等
+    时间维按名称识别（time、ocean_time 等），否则对三维及以上数据取第一个维度。
     """
-    if not isinstance(data, np.ndarray):
-        raise ValueError("Input data must be a NumPy array.")
+    if len(shape) == 0:
+        return None
+    if policy not in ["auto", "map", "timeseries"]:
+        raise ValueError(f"Unsupported chunking policy: {policy}. Supported policies are 'auto', 'map' and 'timeseries'.")
+    shape = [max(1, int(size)) for size in shape]
+    budget = max(1, int(target_mb * 1024 * 1024 // itemsize))
+    if int(np.prod(shape, dtype=np.int64)) <= budget:
+        return tuple(shape)
 
-    np_dtype, clip_min, clip_max = _get_dtype_info(dtype)
+    time_axis = next((i for i, dim in enumerate(dims) if dim in _TIME_DIM_NAMES), 0 if len(shape) >= 3 else None)
+    spatial_axes = [i for i in range(len(shape)) if i != time_axis][-2:]
+    chunks = [1] * len(shape)
+
+    if time_axis is None or policy == "map":
+        tile = _fit_tile([shape[i] for i in spatial_axes], budget)
+    elif policy == "timeseries":
+        chunks[time_axis] = min(shape[time_axis], budget)
+        tile = _fit_tile([shape[i] for i in spatial_axes], max(1, budget // chunks[time_axis]))
+    else:
+        # 设 chunk 在水平方向占比为 f、时间方向长度为 c_t：读一张图涉及 1/f^2 个 chunk，
+        # 读一条时间序列涉及 T/c_t 个 chunk，令二者相等并满足 chunk 总大小约为 budget
+        spatial_total = int(np.prod([shape[i] for i in spatial_axes], dtype=np.int64))
+        fraction = (budget / (shape[time_axis] * spatial_total)) ** 0.25
+        chunks[time_axis] = max(1, min(shape[time_axis], int(round(shape[time_axis] * fraction**2))))
+        tile = _fit_tile([shape[i] for i in spatial_axes], max(1, budget // chunks[time_axis]))
+
+    for axis, size in zip(spatial_axes, tile):
+        chunks[axis] = size
+    return tuple(chunks)
+
+
+def _compression_encoding(varname, dims, shape, itemsize, compile_switch=True, compression_options=None, chunking=None):
+    """
+    生成单个变量的压缩参数（可直接作为 xarray encoding 或 netCDF4.createVariable 的关键字参数）。
+
+    compression_options 中 "compression"、"complevel"、"shuffle"、"chunksizes" 对所有变量生效，
+    以变量名为键的子字典只对该变量生效并覆盖全局设置；chunksizes 也可以是 "auto"、"map" 或 "timeseries"。
+    chunking 为未指定 chunksizes 时使用的自动分块策略；都未指定时沿用 netCDF 库默认分块。
+    当前 netCDF-C 不支持的压缩算法会回退为 zlib。
+    """
+    compression_options = compression_options or {}
+    options = {k: v for k, v in compression_options.items() if k in _COMPRESSION_KEYS}
+    if isinstance(compression_options.get(varname), dict):
+        options.update(compression_options[varname])
+
+    encoding = {"zlib": compile_switch, "complevel": options.get("complevel", 4)}
+    codec = options.get("compression", "zlib")
+    if compile_switch and codec != "zlib":
+        if _codec_supported(codec):
+            encoding = {"zlib": False, "compression": codec, "complevel": encoding["complevel"]}
+        else:
+            warnings.warn(f"Compression '{codec}' is not supported by the netCDF-C library, falling back to zlib.")
+    if "shuffle" in options:
+        encoding["shuffle"] = bool(options["shuffle"])
+
+    chunksizes = options.get("chunksizes", chunking)
+    if isinstance(chunksizes, str):
+        chunksizes = _auto_chunksizes(dims, shape, itemsize, chunksizes)
+    if chunksizes is not None:
+        encoding["chunksizes"] = tuple(max(1, min(int(c), int(size) or int(c))) for c, size in zip(chunksizes, shape))
+    return encoding
+
+
+def _finite_min_max(data, missing_value=None):
+    """
+    计算单个数据块中有效数据（非NaN、非无穷值、非自定义缺失值）的最小值和最大值。
+    优先使用 NaN 感知的 fmin/fmax 归约，不产生布尔索引拷贝；
+    只有出现无穷值或指定了缺失值时，才借助 where 掩码再归约一次。
+    若没有任何有效数据，返回 (None, None)。
+    """
+    if np.ma.isMaskedArray(data):
+        data = data.astype(np.float64).filled(np.nan) if np.ma.is_masked(data) else data.data
+    data = np.asarray(data)
+    if data.size == 0 or data.dtype.kind not in ["f", "i", "u"]:
+        return None, None
+
+    data_min = np.fmin.reduce(data, axis=None)
+    data_max = np.fmax.reduce(data, axis=None)
+    if missing_value is None and np.isfinite(data_min) and np.isfinite(data_max):
+        return data_min, data_max
 
-    # 创建有效数据掩码，只排除NaN和无穷值
     valid_mask = np.isfinite(data)
-    if hasattr(data, "mask") and np.ma.is_masked(data):
-        valid_mask &= ~data.mask
+    if missing_value is not None:
+        valid_mask &= data != missing_value
+    if not np.any(valid_mask):
+        return None, None
+    if data.dtype.kind == "f":
+        initial_min, initial_max = np.inf, -np.inf
+    else:
+        initial_min, initial_max = np.iinfo(data.dtype).max, np.iinfo(data.dtype).min
+    data_min = np.min(data, where=valid_mask, initial=initial_min)
+    data_max = np.max(data, where=valid_mask, initial=initial_max)
+    return data_min, data_max
+
+
+def _streaming_min_max(data, missing_value=None, chunk_budget_mb=256):
+    """
+    逐切片（沿第一个维度）累积有效数据的最小值和最大值，峰值内存只与 chunk_budget_mb 有关。
+    data 可以是 numpy 数组、xarray.DataArray（含 dask/惰性数据）或 netCDF4.Variable。
+    若没有任何有效数据，返回 (None, None)。
+    """
+    data_min, data_max = None, None
+    for slab in _iter_slabs(data.shape, data.dtype.itemsize, chunk_budget_mb):
+        slab_min, slab_max = _finite_min_max(_load_slab(data, slab), missing_value)
+        if slab_min is None:
+            continue
+        data_min = slab_min if data_min is None else min(data_min, slab_min)
+        data_max = slab_max if data_max is None else max(data_max, slab_max)
+    return data_min, data_max
+
+
+def _scale_offset_from_min_max(data_min, data_max, dtype="int32"):
+    """
+    由有效数据的最小值和最大值计算 scale_factor 和 add_offset。
+    为填充值保留最小值位置，有效数据范围为 [clip_min+1, clip_max]。
+    """
+    np_dtype, clip_min, clip_max = _get_dtype_info(dtype)
 
     # 如果没有有效数据，返回默认值
-    if not np.any(valid_mask):
+    if data_min is None or data_max is None:
         return 1.0, 0.0
 
-    # 基于有效数据计算最小值和最大值
-    data_min = np.min(data[valid_mask])
-    data_max = np.max(data[valid_mask])
-
     # 防止 scale 为 0
     if data_max == data_min:
         scale_factor = 1.0
@@ -84,43 +228,587 @@ def _calculate_scale_and_offset(data, dtype="int32"):
     return scale_factor, add_offset
 
 
-def _data_to_scale_offset(data, scale, offset, dtype="int32"):
+def _calculate_scale_and_offset(data, dtype="int32", missing_value=None):
+    """
+    只对有效数据（非NaN、非无穷值、非自定义缺失值）计算scale_factor和add_offset。
+    为填充值保留最小值位置，有效数据范围为 [clip_min+1, clip_max]。
+    """
+    if not isinstance(data, np.ndarray):
+        raise ValueError("Input data must be a NumPy array.")
+
+    data_min, data_max = _finite_min_max(data, missing_value)
+    return _scale_offset_from_min_max(data_min, data_max, dtype)
+
+
+def _data_to_scale_offset(data, scale, offset, dtype="int32", missing_value=None, out=None, block_size=1 << 20, stats=None, fill_value=None, reserved=()):
     """
     将数据应用 scale 和 offset 转换，转换为整型以实现压缩。
-    NaN、inf 和掩码值将被转换为指定数据类型的最小值作为填充值。
+    NaN、inf、掩码值和自定义缺失值将被转换为指定数据类型的最小值作为填充值。
     
     转换公式：scaled_value = (original_value - add_offset) / scale_factor
     返回整型数组，用最小值表示无效数据
+
+    按块（block_size 个元素）融合完成掩码、减、除、取整、截断和类型转换，
+    所有中间结果都写入复用的块缓冲区（out= 参数），整型结果直接写入预分配的 out 数组，
+    不再产生与整个数组同样大小的临时数组。
+
+    stats 为字典时，在同一个块循环中顺便累积解码误差 |round((x-offset)/scale)*scale+offset - x|
+    （见 _update_pack_stats），无需回读文件或保留第二份完整数据。
+
+    fill_value 不为 None 时（如向已有文件追加，沿用变量自己的 _FillValue），无效数据写为该值；
+    量化后恰好等于 fill_value 或 reserved 中数值（如 missing_value）的有效数据移到相邻的整数，避免被当作缺测
     """
     if not isinstance(data, np.ndarray):
         raise ValueError("Input data must be a NumPy array.")
 
     np_dtype, clip_min, clip_max = _get_dtype_info(dtype)
-    fill_value = clip_min  # 使用数据类型的最小值作为填充值
-    
-    # 创建输出数组，初始化为填充值
-    result = np.full(data.shape, fill_value, dtype=np_dtype)
-    
-    # 只对有限值进行转换
-    valid_mask = np.isfinite(data)
-    
-    # 对于掩码数组，排除掩码区域
-    if hasattr(data, "mask") and np.ma.is_masked(data):
-        valid_mask &= ~data.mask
-    
-    if np.any(valid_mask):
-        # 进行scale/offset转换
-        scaled = (data[valid_mask] - offset) / scale
-        # 四舍五入并转换为目标整型，同时确保在有效范围内
-        scaled_int = np.round(scaled).astype(np_dtype)
+    if fill_value is None:
+        fill_value = clip_min  # 使用数据类型的最小值作为填充值
+    fill_value = int(fill_value)
+    avoid = sorted({int(v) for v in (fill_value, *reserved) if clip_min < int(v) <= clip_max})
+
+    if out is None:
+        out = np.empty(data.shape, dtype=np_dtype)
+    elif out.shape != data.shape or out.dtype != np_dtype or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous {np.dtype(np_dtype).name} array of shape {data.shape}.")
+
+    data_mask = np.ma.getmaskarray(data).reshape(-1) if np.ma.is_masked(data) else None
+    flat_in = np.ascontiguousarray(np.ma.getdata(data)).reshape(-1)
+    flat_out = out.reshape(-1)
+
+    # float32 精度不足以表示 int32/int64 的取值范围，此时使用 float64 计算
+    if flat_in.dtype == np.float32 and np_dtype not in (np.int32, np.int64):
+        work_dtype = np.float32
+    else:
+        work_dtype = np.float64
+    clip_low, clip_high = _clip_bounds(dtype, work_dtype)
+    block_size = max(1, min(int(block_size), flat_in.size))
+    work = np.empty(block_size, dtype=work_dtype)
+    valid = np.empty(block_size, dtype=bool)
+    error = np.empty(block_size, dtype=np.float64) if stats is not None else None
+
+    for start in range(0, flat_in.size, block_size):
+        stop = min(start + block_size, flat_in.size)
+        n = stop - start
+        blk, w, m, o = flat_in[start:stop], work[:n], valid[:n], flat_out[start:stop]
+
+        # 有效掩码：排除 NaN、inf、掩码和自定义缺失值
+        np.isfinite(blk, out=m)
+        if data_mask is not None:
+            m &= ~data_mask[start:stop]
+        if missing_value is not None:
+            m &= blk != missing_value
+
         # 由于我们使用了最小值作为填充值，所以有效数据范围是 [clip_min+1, clip_max]
-        scaled_int = np.clip(scaled_int, clip_min + 1, clip_max)
-        result[valid_mask] = scaled_int
-    
-    return result, fill_value
+        np.subtract(blk, offset, out=w, casting="unsafe")
+        np.divide(w, scale, out=w)
+        np.rint(w, out=w)
+        np.clip(w, clip_low, clip_high, out=w)
+        for value in avoid:
+            np.copyto(w, value + 1 if value < clip_max else value - 1, where=w == value)
+
+        o.fill(fill_value)
+        np.copyto(o, w, casting="unsafe", where=m)
+        if stats is not None:
+            _update_pack_stats(stats, blk, w, m, scale, offset, error[:n])
+
+    return out, fill_value
+
+
+def _update_pack_stats(stats, original, quantized, valid, scale, offset, error):
+    """
+    累积单个数据块的 scale/offset 量化误差：error 为复用的 float64 块缓冲区，只统计有效数据。
+    """
+    np.multiply(quantized, scale, out=error, dtype=np.float64)
+    error += offset
+    error -= original
+    np.abs(error, out=error)
+    count = int(np.count_nonzero(valid))
+    if count == 0:
+        return
+    stats["count"] = stats.get("count", 0) + count
+    stats["sum_abs_error"] = stats.get("sum_abs_error", 0.0) + float(np.sum(error, where=valid))
+    stats["max_abs_error"] = max(stats.get("max_abs_error", 0.0), float(np.max(error, where=valid, initial=0.0)))
+
+
+def _pack_report(stats, dtype, scale, offset, data_min, data_max):
+    """
+    整理单个变量的 scale/offset 量化误差报告。
+    max_rel_error 为最大绝对误差相对于有效数据范围（max - min）的比例。
+    """
+    max_abs_error = stats.get("max_abs_error", 0.0)
+    data_range = float(data_max - data_min) if data_min is not None else 0.0
+    return {
+        "dtype": dtype,
+        "scale_factor": float(scale),
+        "add_offset": float(offset),
+        "max_abs_error": max_abs_error,
+        "mean_abs_error": stats.get("sum_abs_error", 0.0) / max(1, stats.get("count", 0)),
+        "max_rel_error": max_abs_error / data_range if data_range > 0 else 0.0,
+    }
+
+
+def _unpacked_report(dtype):
+    """
+    没有有效数据、按原类型写出（未打包）的变量的误差报告：与 _pack_report 结构相同，
+    scale_factor/add_offset 为 None，误差统计为 NaN。
+    """
+    return {
+        "dtype": np.dtype(dtype).name,
+        "scale_factor": None,
+        "add_offset": None,
+        "max_abs_error": np.nan,
+        "mean_abs_error": np.nan,
+        "max_rel_error": np.nan,
+    }
+
+
+def _choose_pack_dtype(data_min, data_max, tolerance, default="int32"):
+    """
+    按容许的最大绝对误差 tolerance 选择最小的打包类型（int8、int16、int32 依次尝试）。
+    四舍五入量化的最大误差为 scale_factor / 2；若 int32 仍不满足，给出警告并使用 int32。
+    """
+    if data_min is None:
+        return default
+    for dtype in ("int8", "int16", "int32"):
+        scale, _ = _scale_offset_from_min_max(data_min, data_max, dtype)
+        if data_max == data_min or scale / 2 <= tolerance:
+            return dtype
+    warnings.warn(f"Tolerance {tolerance} cannot be met with int32 packing (error up to {scale / 2:.3g}), using int32.")
+    return "int32"
+
+
+def _keepbits(significant_bits=None, significant_digits=None):
+    """
+    将有效二进制位数或有效十进制位数转换为 float32 尾数中保留的位数（1~23）。
+    """
+    if significant_bits is not None:
+        keepbits = int(significant_bits)
+    else:
+        keepbits = int(np.ceil(significant_digits * np.log2(10)))
+    if not 1 <= keepbits <= 23:
+        raise ValueError(f"Number of kept mantissa bits must be within [1, 23] for float32 data, got {keepbits}.")
+    return keepbits
+
+
+def _bitround(data, keepbits, missing_value=None):
+    """
+    位舍入（BitRound）：转换为 float32，并将尾数中 keepbits 之后的位按就近舍入（平局取偶）置零，
+    使数据在 zlib 等无损压缩下获得更高压缩比。NaN、inf 保持不变，自定义缺失值转为 NaN。
+    """
+    out = np.array(data, dtype=np.float32)
+    if missing_value is not None:
+        np.copyto(out, np.nan, where=np.asarray(data) == missing_value)
+    if keepbits >= 23:
+        return out
+    bits = out.view(np.uint32)
+    maskbits = 23 - keepbits
+    half = np.uint32((1 << (maskbits - 1)) - 1)
+    mask = np.uint32((0xFFFFFFFF >> maskbits) << maskbits)
+    rounded = (bits >> maskbits) & np.uint32(1)
+    rounded += bits
+    rounded += half
+    rounded &= mask
+    np.copyto(bits, rounded, where=np.isfinite(out))
+    return out
+
+
+def _update_bitround_stats(stats, original, rounded, complevel=4, block_size=1 << 20, n_samples=16, sample_size=1 << 14):
+    """
+    累积位舍入的误差统计与压缩比估计。
+    误差按块（block_size 个元素）在复用的 float64 缓冲区中计算，不产生与整个数组同样大小的临时数组；
+    压缩比只对均匀分布的 n_samples 段（每段 sample_size 个元素）按 HDF5 shuffle + zlib 的方式压缩估算，
+    是估计值而非写出后的实际压缩比，开销与数组大小无关。
+    """
+    import zlib
+
+    flat_in = np.ascontiguousarray(original).reshape(-1)
+    flat_out = np.ascontiguousarray(rounded).reshape(-1)
+    block_size = max(1, min(int(block_size), flat_out.size))
+    diff = np.empty(block_size, dtype=np.float64)
+    denom = np.empty(block_size, dtype=np.float64)
+    valid = np.empty(block_size, dtype=bool)
+    nonzero = np.empty(block_size, dtype=bool)
+    for start in range(0, flat_out.size, block_size):
+        stop = min(start + block_size, flat_out.size)
+        n = stop - start
+        blk_in, blk_out, d, den, m, nz = flat_in[start:stop], flat_out[start:stop], diff[:n], denom[:n], valid[:n], nonzero[:n]
+        np.isfinite(blk_out, out=m)
+        np.subtract(blk_out, blk_in, out=d, dtype=np.float64)
+        np.abs(d, out=d)
+        stats["max_abs_error"] = max(stats.get("max_abs_error", 0.0), float(np.max(d, where=m, initial=0.0)))
+        np.abs(blk_in, out=den, dtype=np.float64)
+        np.greater(den, 0, out=nz)
+        nz &= m
+        np.divide(d, den, out=d, where=nz)
+        stats["max_rel_error"] = max(stats.get("max_rel_error", 0.0), float(np.max(d, where=nz, initial=0.0)))
+
+    if flat_out.size > n_samples * sample_size:
+        starts = np.linspace(0, flat_out.size - sample_size, n_samples).astype(np.int64)
+        sample = np.concatenate([flat_out[i : i + sample_size] for i in starts])
+    else:
+        sample = flat_out
+    shuffled = np.ascontiguousarray(sample.astype(np.float32, copy=False).view(np.uint8).reshape(-1, 4).T)
+    stats["sample_bytes"] = stats.get("sample_bytes", 0) + shuffled.nbytes
+    stats["compressed_sample_bytes"] = stats.get("compressed_sample_bytes", 0) + len(zlib.compress(shuffled.tobytes(), complevel or 1))
+
+
+def _bitround_report(stats, keepbits):
+    """整理单个变量的位舍入报告，ratio_estimate 为按抽样估计的 shuffle + zlib 压缩比（相对于 float32）"""
+    return {
+        "keepbits": keepbits,
+        "ratio_estimate": stats.get("sample_bytes", 0) / max(1, stats.get("compressed_sample_bytes", 0)),
+        "max_abs_error": stats.get("max_abs_error", 0.0),
+        "max_rel_error": stats.get("max_rel_error", 0.0),
+    }
+
+
+def _iter_slabs(shape, itemsize, chunk_budget_mb=256):
+    """
+    沿第一个维度切分数据，使每个切片（slab）的大小不超过 chunk_budget_mb。
+    0 维数据返回一个空元组索引；每个切片至少包含第一个维度上的一层。
+    """
+    if len(shape) == 0:
+        yield ()
+        return
+    row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * int(itemsize)
+    budget_bytes = max(1, int(chunk_budget_mb * 1024 * 1024))
+    step = max(1, budget_bytes // max(1, row_bytes))
+    for start in range(0, shape[0], step):
+        yield slice(start, min(start + step, shape[0]))
+
+
+def _load_slab(data, slab):
+    """
+    只读取数据在第一个维度上的一个切片，惰性（dask/文件后端）数据在此时才真正加载。
+    netCDF4.Variable 返回的掩码数组会被转换为以 NaN 表示缺测的普通数组。
+    """
+    if isinstance(data, xr.DataArray):
+        if slab == ():
+            return np.asarray(data.values)
+        return np.asarray(data.isel({data.dims[0]: slab}).values)
+    arr = data[slab]
+    if np.ma.isMaskedArray(arr):
+        arr = arr.astype(np.float64).filled(np.nan) if np.ma.is_masked(arr) else arr.data
+    return np.asarray(arr)
+
+
+def _save_to_nc_streaming(file, data, varname=None, mode="w", convert_dtype="int16", scale_offset_switch=True, compile_switch=True, chunk_budget_mb=256, compression_options=None, chunking=None, unlimited_dims=None, keepbits=None, verify=False, tolerance=None):
+    """
+    流式保存 xarray 对象（DataArray 或 Dataset），适用于大于内存的数据。
+    keepbits 不为 None 时，浮点变量改为逐切片位舍入后以 float32 写出，并返回各变量的位舍入报告。
+    verify 为 True 或指定 tolerance 时，在写出各切片的同时累积量化误差并返回误差报告。
+
+    坐标变量、全局属性和非数值型变量仍交由 xarray 写出（保证时间等坐标的 CF 编码），
+    数值型数据变量则通过 netCDF4 逐切片写入：第一遍逐切片求 min/max 得到 scale_factor/add_offset，
+    第二遍逐切片压缩并直接写入文件。峰值内存约为 chunk_budget_mb 的数倍，而不是整个变量的数倍。
+    dask 数组或惰性打开的文件变量都只会在处理对应切片时加载。
+    """
+    if isinstance(data, xr.DataArray):
+        if data.name is None:
+            data = data.rename("data")
+        varname = data.name if varname is None else varname
+        data = data.to_dataset(name=varname)
+
+    if mode == "w" and os.path.exists(file):
+        os.remove(file)
+    elif mode == "a" and not os.path.exists(file):
+        mode = "w"
+
+    stream_vars = [var for var in data.data_vars if np.issubdtype(data[var].dtype, np.number)]
+
+    # 坐标、属性以及非数值变量由 xarray 写出
+    skeleton = data.drop_vars(stream_vars)
+    for var in skeleton.data_vars:
+        for k in ["_FillValue", "missing_value"]:
+            skeleton[var].attrs.pop(k, None)
+    skeleton.to_netcdf(file, mode=mode, unlimited_dims=unlimited_dims)
+
+    report = {}
+    with nc.Dataset(file, "a") as ncfile:
+        for dim, size in data.sizes.items():
+            if dim not in ncfile.dimensions:
+                ncfile.createDimension(dim, None if dim in (unlimited_dims or []) else size)
+
+        for var in stream_vars:
+            da = data[var]
+            data_missing_val = da.attrs.get("missing_value", None)
+            attrs = {k: v for k, v in da.attrs.items() if k not in ["_FillValue", "missing_value", "scale_factor", "add_offset"]}
+
+            if keepbits is not None and np.issubdtype(da.dtype, np.floating):
+                var_encoding = _compression_encoding(var, da.dims, da.shape, 4, compile_switch, compression_options, chunking)
+                var_obj = ncfile.createVariable(var, "f4", da.dims, **var_encoding)
+                var_obj.setncatts(attrs)
+                stats = {}
+                for slab in _iter_slabs(da.shape, da.dtype.itemsize, chunk_budget_mb):
+                    arr = _load_slab(da, slab)
+                    rounded = _bitround(arr, keepbits, data_missing_val)
+                    _update_bitround_stats(stats, arr, rounded, var_encoding.get("complevel", 4))
+                    var_obj[slab] = rounded
+                report[var] = _bitround_report(stats, keepbits)
+                continue
+
+            data_min, data_max = None, None
+            if scale_offset_switch and keepbits is None:
+                data_min, data_max = _streaming_min_max(da, data_missing_val, chunk_budget_mb)
+
+            if data_min is None:
+                # 不打包或没有有效数据：按原始类型逐切片写出（位舍入模式和关闭 scale_offset_switch 时数值变量只做无损压缩）
+                var_encoding = {"zlib": False}
+                if keepbits is not None or (not scale_offset_switch and np.issubdtype(da.dtype, np.number)):
+                    var_encoding = _compression_encoding(var, da.dims, da.shape, da.dtype.itemsize, compile_switch, compression_options, chunking)
+                var_obj = ncfile.createVariable(var, _numpy_to_nc_type(da.dtype), da.dims, **var_encoding)
+                var_obj.setncatts(attrs)
+                for slab in _iter_slabs(da.shape, da.dtype.itemsize, chunk_budget_mb):
+                    var_obj[slab] = _load_slab(da, slab)
+                if (verify or tolerance is not None) and scale_offset_switch and keepbits is None:
+                    report[var] = _unpacked_report(da.dtype)
+                continue
+
+            var_dtype = convert_dtype if tolerance is None else _choose_pack_dtype(data_min, data_max, tolerance, convert_dtype)
+            nc_dtype = _numpy_to_nc_type(var_dtype)
+            scale, offset = _scale_offset_from_min_max(data_min, data_max, var_dtype)
+            _, fill_value, _ = _get_dtype_info(var_dtype)
+            var_encoding = _compression_encoding(var, da.dims, da.shape, np.dtype(nc_dtype).itemsize, compile_switch, compression_options, chunking)
+            var_obj = ncfile.createVariable(var, nc_dtype, da.dims, fill_value=fill_value, **var_encoding)
+            var_obj.setncatts(attrs)
+            var_obj.scale_factor = float(scale)
+            var_obj.add_offset = float(offset)
+            # 直接写入已压缩的整型数据，避免 netCDF4 再次自动缩放
+            var_obj.set_auto_maskandscale(False)
+
+            # 整型输出缓冲区只分配一次，各切片复用
+            out_buffer = None
+            stats = {} if verify or tolerance is not None else None
+            for slab in _iter_slabs(da.shape, da.dtype.itemsize, chunk_budget_mb):
+                arr = _load_slab(da, slab)
+                if out_buffer is None:
+                    out_buffer = np.empty(arr.shape, dtype=_get_dtype_info(var_dtype)[0])
+                out = out_buffer[: arr.shape[0]] if arr.ndim > 0 else out_buffer
+                new_values, _ = _data_to_scale_offset(arr, scale, offset, var_dtype, data_missing_val, out=out, stats=stats)
+                var_obj[slab] = new_values
+            if stats is not None:
+                report[var] = _pack_report(stats, var_dtype, scale, offset, data_min, data_max)
+    return report if keepbits is not None or verify or tolerance is not None else None
 
 
-def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='int16', scale_offset_switch=True, compile_switch=True, preserve_mask_values=True, missing_value=None):
+def _encode_append_coord(values, ncvar):
+    """
+    按文件中已有坐标变量的 units/calendar 对新的坐标值进行 CF 编码（时间坐标），其余坐标原样返回。
+    """
+    import cftime
+    import pandas as pd
+
+    values = np.asarray(values)
+    if values.dtype.kind == "M" or values.dtype == object:
+        if "units" not in ncvar.ncattrs():
+            raise ValueError(f"Coordinate '{ncvar.name}' has no units attribute, cannot encode time values.")
+        dates = pd.DatetimeIndex(values).to_pydatetime() if values.dtype.kind == "M" else values
+        values = np.asarray(cftime.date2num(dates, ncvar.units, getattr(ncvar, "calendar", "standard")))
+    if ncvar.dtype.kind in ["i", "u"] and values.dtype.kind == "f" and not np.all(values == np.round(values)):
+        raise ValueError(f"New values of '{ncvar.name}' cannot be stored exactly as {ncvar.dtype} in units '{getattr(ncvar, 'units', '')}'.")
+    return values
+
+
+def _existing_records(ncvar, axis, length, chunk_budget_mb=256):
+    """
+    逐切片生成变量在 append 维度（第 axis 维）上前 length 条已有记录的索引。
+    追加过程中无限长维度可能已被其他变量扩展，尚未写入的部分不应被读取。
+    """
+    shape = list(ncvar.shape)
+    shape[axis] = length
+    for slab in _iter_slabs(shape, ncvar.dtype.itemsize, chunk_budget_mb):
+        index = [slice(None)] * len(shape)
+        index[0] = slab
+        if axis != 0:
+            index[axis] = slice(0, length)
+        yield tuple(index)
+
+
+def _packed_fill_values(ncvar):
+    """
+    已打包变量的填充值和其余缺测值：填充值取 _FillValue，没有时取 missing_value，都没有时为打包时使用的整数类型最小值；
+    其余缺测值为与填充值不同的 missing_value
+    """
+    fill_value = getattr(ncvar, "_FillValue", None)
+    missing = [int(v) for v in np.atleast_1d(getattr(ncvar, "missing_value", []))]
+    if fill_value is None:
+        fill_value = missing[0] if missing else _get_dtype_info(ncvar.dtype.name)[1]
+    fill_value = int(fill_value)
+    return fill_value, tuple(v for v in missing if v != fill_value)
+
+
+def _repack_nc_var(ncvar, axis, length, new_scale, new_offset, chunk_budget_mb=256):
+    """
+    用新的 scale_factor/add_offset 原地重新编码已压缩变量的已有记录（逐切片读写），并更新属性。
+    缺测按变量自己的填充值和 missing_value 识别，并以同样的填充值写回
+    """
+    old_scale, old_offset = ncvar.scale_factor, getattr(ncvar, "add_offset", 0.0)
+    fill_value, reserved = _packed_fill_values(ncvar)
+    ncvar.set_auto_maskandscale(False)
+    for index in _existing_records(ncvar, axis, length, chunk_budget_mb):
+        raw = ncvar[index]
+        decoded = raw * old_scale + old_offset
+        decoded[np.isin(raw, (fill_value, *reserved))] = np.nan
+        ncvar[index], _ = _data_to_scale_offset(decoded, new_scale, new_offset, ncvar.dtype.name, fill_value=fill_value, reserved=reserved)
+    ncvar.scale_factor = float(new_scale)
+    ncvar.add_offset = float(new_offset)
+
+
+def _append_to_nc(file, data, append_dim, varname=None, chunk_budget_mb=256):
+    """
+    沿无限长维度 append_dim 向已有文件追加新记录，只写入新的切片，不重写整个文件。
+
+    对已压缩（scale_factor/add_offset）的变量，先检查已有的打包参数能否覆盖新数据的取值范围；
+    若不能，则按新旧数据的联合范围重新计算打包参数，并原地重新编码已有记录后再追加。
+    打包类型和填充值沿用文件中的变量（_FillValue/missing_value），新数据中的缺测写为同样的填充值。
+    新数据中的变量必须已存在于文件中；坐标值按文件中的 units/calendar 编码。
+    所有检查（变量、维度、记录数、坐标编码）都在写入第一条记录之前完成，检查失败时文件保持不变。
+    """
+    if isinstance(data, xr.DataArray):
+        if data.name is None:
+            data = data.rename("data")
+        varname = data.name if varname is None else varname
+        data = data.to_dataset(name=varname)
+    if append_dim not in data.dims:
+        raise ValueError(f"Dimension '{append_dim}' not found in the data to append.")
+
+    with nc.Dataset(file, "r+") as ncfile:
+        if append_dim not in ncfile.dimensions:
+            raise ValueError(f"Dimension '{append_dim}' not found in {file}.")
+        if not ncfile.dimensions[append_dim].isunlimited():
+            raise ValueError(f"Dimension '{append_dim}' in {file} is not unlimited; rewrite the file once with save(..., append_dim='{append_dim}').")
+
+        start = len(ncfile.dimensions[append_dim])
+        count = data.sizes[append_dim]
+        missing = [var for var in data.variables if append_dim in data[var].dims and var not in ncfile.variables]
+        if missing:
+            raise ValueError(f"Variables {missing} not found in {file}; append mode can only extend existing variables.")
+
+        # 第一遍只检查并准备：维度、已有记录数、坐标编码和新数据的取值范围，不写入任何数据
+        plan = []
+        for var in data.variables:
+            da = data[var]
+            if append_dim not in da.dims:
+                continue
+            ncvar = ncfile.variables[var]
+            if set(ncvar.dimensions) != set(da.dims):
+                raise ValueError(f"Dimensions of '{var}' {da.dims} do not match those in the file {ncvar.dimensions}.")
+            da = da.transpose(*ncvar.dimensions)
+            axis = ncvar.dimensions.index(append_dim)
+            if ncvar.shape[axis] != start:
+                raise ValueError(f"Variable '{var}' has {ncvar.shape[axis]} records along '{append_dim}', expected {start}; the file may hold an incomplete append.")
+            if var in data.coords:
+                plan.append((var, da, ncvar, axis, _encode_append_coord(da.values, ncvar), None))
+                continue
+            packed = "scale_factor" in ncvar.ncattrs() and ncvar.dtype.name in ["int8", "int16", "int32", "int64"]
+            data_missing_val = da.attrs.get("missing_value", None)
+            new_range = _streaming_min_max(da, data_missing_val, chunk_budget_mb) if packed else None
+            plan.append((var, da, ncvar, axis, None, new_range))
+
+        for var, da, ncvar, axis, coord_values, new_range in plan:
+
+            def _target(slab):
+                # 把 da 第一个维度上的切片映射到文件变量中的写入位置
+                index = [slice(None)] * da.ndim
+                index[0] = slab
+                if axis == 0:
+                    index[0] = slice(slab.start + start, slab.stop + start)
+                else:
+                    index[axis] = slice(start, start + count)
+                return tuple(index)
+
+            if coord_values is not None:
+                index = [slice(None)] * da.ndim
+                index[axis] = slice(start, start + count)
+                ncvar[tuple(index)] = coord_values
+                continue
+
+            if new_range is None:
+                for slab in _iter_slabs(da.shape, da.dtype.itemsize, chunk_budget_mb):
+                    ncvar[_target(slab)] = _load_slab(da, slab)
+                continue
+
+            # 检查已有的打包参数能否覆盖新数据，否则重新编码已有记录
+            packed_dtype = ncvar.dtype.name
+            _, clip_min, clip_max = _get_dtype_info(packed_dtype)
+            scale, offset = float(ncvar.scale_factor), float(getattr(ncvar, "add_offset", 0.0))
+            data_missing_val = da.attrs.get("missing_value", None)
+            new_min, new_max = new_range
+            if new_min is not None and (new_min < offset + (clip_min + 1) * scale or new_max > offset + clip_max * scale):
+                ncvar.set_auto_maskandscale(True)
+                data_min, data_max = new_min, new_max
+                for index in _existing_records(ncvar, axis, start, chunk_budget_mb):
+                    old_min, old_max = _finite_min_max(_load_slab(ncvar, index))
+                    if old_min is not None:
+                        data_min, data_max = min(data_min, old_min), max(data_max, old_max)
+                scale, offset = _scale_offset_from_min_max(data_min, data_max, packed_dtype)
+                _repack_nc_var(ncvar, axis, start, scale, offset, chunk_budget_mb)
+
+            fill_value, reserved = _packed_fill_values(ncvar)
+            ncvar.set_auto_maskandscale(False)
+            for slab in _iter_slabs(da.shape, da.dtype.itemsize, chunk_budget_mb):
+                new_values, _ = _data_to_scale_offset(_load_slab(da, slab), scale, offset, packed_dtype, data_missing_val, fill_value=fill_value, reserved=reserved)
+                ncvar[_target(slab)] = new_values
+
+
+def _pack_dataset_var(da, convert_dtype="int16", scale_offset_switch=True, compile_switch=True, compression_options=None, chunking=None, keepbits=None, verify=False, tolerance=None):
+    """
+    对 Dataset 中的单个数据变量进行掩码和 scale/offset 压缩转换（keepbits 不为 None 时对浮点变量改为位舍入）。
+    verify 为 True 或指定 tolerance 时统计量化误差，tolerance 还会为该变量选择满足误差的最小整数类型。
+    返回新的 DataArray、该变量的 encoding（不压缩时为 None）以及位舍入/误差报告（未统计时为 None）。
+    """
+    arr = np.array(da.values)
+    data_missing_val = da.attrs.get("missing_value", None)
+
+    attrs = da.attrs.copy()
+    for k in ["_FillValue", "missing_value"]:
+        if k in attrs:
+            del attrs[k]
+
+    if keepbits is not None and np.issubdtype(arr.dtype, np.floating):
+        rounded = _bitround(arr, keepbits, data_missing_val)
+        encoding = _compression_encoding(da.name, da.dims, da.shape, 4, compile_switch, compression_options, chunking)
+        encoding["dtype"] = "f4"
+        stats = {}
+        _update_bitround_stats(stats, arr, rounded, encoding.get("complevel", 4))
+        return xr.DataArray(rounded, dims=da.dims, coords=da.coords, attrs=attrs), encoding, _bitround_report(stats, keepbits)
+
+    if keepbits is not None and np.issubdtype(arr.dtype, np.number):
+        # 位舍入模式下，非浮点数值变量只做无损压缩
+        encoding = _compression_encoding(da.name, da.dims, da.shape, arr.dtype.itemsize, compile_switch, compression_options, chunking)
+        return xr.DataArray(arr, dims=da.dims, coords=da.coords, attrs=attrs), encoding, None
+
+    if not (np.issubdtype(arr.dtype, np.number) and scale_offset_switch):
+        # 不打包的数值变量仍按 compile_switch/compression_options/chunking 做无损压缩
+        encoding = _compression_encoding(da.name, da.dims, da.shape, arr.dtype.itemsize, compile_switch, compression_options, chunking) if np.issubdtype(arr.dtype, np.number) else None
+        return xr.DataArray(arr, dims=da.dims, coords=da.coords, attrs=attrs), encoding, None
+
+    # 处理边缘情况：检查是否有有效数据
+    data_min, data_max = _finite_min_max(arr, data_missing_val)
+    if data_min is None:
+        # 如果没有有效数据，创建一个简单的拷贝，不做转换
+        report = _unpacked_report(arr.dtype) if verify or tolerance is not None else None
+        return xr.DataArray(arr, dims=da.dims, coords=da.coords, attrs=attrs), None, report
+
+    if tolerance is not None:
+        convert_dtype = _choose_pack_dtype(data_min, data_max, tolerance, convert_dtype)
+    scale, offset = _scale_offset_from_min_max(data_min, data_max, convert_dtype)
+
+    # 进行压缩转换（_data_to_scale_offset会正确处理NaN、掩码和自定义缺失值）
+    stats = {} if verify or tolerance is not None else None
+    new_values, fill_value = _data_to_scale_offset(arr, scale, offset, convert_dtype, data_missing_val, stats=stats)
+    report = _pack_report(stats, convert_dtype, scale, offset, data_min, data_max) if stats is not None else None
+    new_da = xr.DataArray(new_values, dims=da.dims, coords=da.coords, attrs=attrs)
+    new_da.attrs["scale_factor"] = float(scale)
+    new_da.attrs["add_offset"] = float(offset)
+    encoding = _compression_encoding(da.name, da.dims, da.shape, np.dtype(new_values.dtype).itemsize, compile_switch, compression_options, chunking)
+    encoding["dtype"] = _numpy_to_nc_type(convert_dtype)
+    encoding["_FillValue"] = fill_value  # 使用计算出的填充值
+    return new_da, encoding, report
+
+
+def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='int16', scale_offset_switch=True, compile_switch=True, preserve_mask_values=True, missing_value=None, streaming=False, chunk_budget_mb=256, workers=None, compression_options=None, chunking=None, append_dim=None, significant_bits=None, significant_digits=None, verify=False, tolerance=None):
     """
     保存数据到 NetCDF 文件，支持 xarray 对象（DataArray 或 Dataset）和 numpy 数组。
 
@@ -135,20 +823,62 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
       - varname: 变量名（仅适用于传入 numpy 数组或 DataArray 时）
       - coords: 坐标字典（numpy 数组分支时使用），所有坐标变量均不压缩
       - mode: "w"（覆盖）或 "a"（追加）
-      - convert_dtype: 转换为的数值类型（"int8", "int16", "int32", "int64"），默认为 "int32"
+      - convert_dtype: 转换为的数值类型（"int8", "int16", "int32", "int64"），默认为 "int32"；
+        追加模式（append_dim 且文件已存在）下忽略，沿用文件中已有的类型和填充值
       - scale_offset_switch: 是否对数值型数据变量进行压缩转换
       - compile_switch: 是否启用 NetCDF4 的 zlib 压缩（仅针对数值型数据有效）
       - preserve_mask_values: 是否保留掩码区域的原始值（True）或将其替换为缺省值（False）
       - missing_value: 自定义缺失值，将被替换为 NaN
+      - streaming: 是否对 xarray 对象逐切片流式写出（适用于 dask 或惰性打开的大数据）
+      - chunk_budget_mb: 流式写出时每个切片的内存预算（MB）
+      - workers: Dataset 分支中并行压缩各数据变量的线程数，None 或 1 表示逐个处理
+      - compression_options: 压缩变量的 compression/complevel/shuffle/chunksizes 设置，可按变量名分别指定；
+        scale_offset_switch 为 False 时同样作用于不打包的数值变量（无损压缩）
+      - chunking: 自动分块策略（"auto"、"map"、"timeseries"），None 表示使用 netCDF 库默认分块
+      - append_dim: 沿该（无限长）维度追加记录；文件不存在时新建文件并将该维度设为无限长（仅适用于 xarray 对象）
+      - significant_bits / significant_digits: 指定其一时，浮点数据不再做 scale/offset 压缩，
+        而是保留 float32 并按有效二进制位数/有效十进制位数进行位舍入；此时返回各变量的
+        {"keepbits", "ratio_estimate", "max_abs_error", "max_rel_error"} 报告（ratio_estimate 为对抽样数据按 shuffle+zlib 估计的压缩比，不是文件中的实际压缩比）
+      - verify: 是否在打包的同时统计各变量的量化误差，返回
+        {"dtype", "scale_factor", "add_offset", "max_abs_error", "mean_abs_error", "max_rel_error"} 报告
+        （max_rel_error 为最大绝对误差相对于数据范围的比例）；误差在编码的块循环中计算，不回读文件、不额外复制数据。
+        没有有效数据而按原类型写出的变量也有报告，其 scale_factor/add_offset 为 None，误差为 NaN
+      - tolerance: 容许的最大绝对误差；指定时为每个打包变量选择满足该误差的最小整数类型（int8/int16/int32，
+        覆盖 convert_dtype），并同样返回误差报告。追加模式（append_dim 且文件已存在）沿用文件中已有的类型，不统计误差
+
+    返回：
+      - 位舍入模式或 verify/tolerance 模式下返回 {变量名: 报告} 字典，否则返回 None
     """
     if convert_dtype not in ["int8", "int16", "int32", "int64"]:
         convert_dtype = "int32"
     nc_dtype = _numpy_to_nc_type(convert_dtype)
+    keepbits = None
+    if significant_bits is not None or significant_digits is not None:
+        keepbits = _keepbits(significant_bits, significant_digits)
+    verify = verify or tolerance is not None
+
+    unlimited_dims = None
+    if append_dim is not None:
+        if not isinstance(data, (xr.DataArray, xr.Dataset)):
+            raise ValueError("append_dim is only supported for xarray.DataArray or xarray.Dataset data.")
+        if os.path.exists(file):
+            _append_to_nc(file, data, append_dim, varname, chunk_budget_mb)
+            return
+        mode = "w"
+        unlimited_dims = [append_dim]
+
+    if streaming and isinstance(data, (xr.DataArray, xr.Dataset)):
+        return _save_to_nc_streaming(file, data, varname, mode, convert_dtype, scale_offset_switch, compile_switch, chunk_budget_mb, compression_options, chunking, unlimited_dims, keepbits, verify, tolerance)
 
     # ----------------------------------------------------------------------------
     # 处理 xarray 对象（DataArray 或 Dataset）
     if isinstance(data, (xr.DataArray, xr.Dataset)):
         encoding = {}
+        if (keepbits is not None or verify) and isinstance(data, xr.DataArray):
+            # 位舍入和误差统计统一由 Dataset 分支处理
+            if data.name is None:
+                data = data.rename("data")
+            data = data.to_dataset(name=data.name if varname is None else varname)
         if isinstance(data, xr.DataArray):
             if data.name is None:
                 data = data.rename("data")
@@ -156,36 +886,21 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
             arr = np.array(data.values)
             data_missing_val = data.attrs.get("missing_value", None)
 
-            valid_mask = np.ones(arr.shape, dtype=bool)
-            if arr.dtype.kind in ["f", "i", "u"]:
-                valid_mask = np.isfinite(arr)
-                if data_missing_val is not None:
-                    valid_mask &= arr != data_missing_val
-                if hasattr(arr, "mask"):
-                    valid_mask &= ~arr.mask
-
             if np.issubdtype(arr.dtype, np.number) and scale_offset_switch:
-                # 确保有有效数据用于计算scale/offset
-                if not np.any(valid_mask):
+                # 确保有有效数据用于计算scale/offset（NaN 感知归约，不产生有效数据拷贝）
+                data_min, data_max = _finite_min_max(arr, data_missing_val)
+                if data_min is None:
                     # 如果没有有效数据，不进行压缩转换
                     for k in ["_FillValue", "missing_value"]:
                         if k in data.attrs:
                             del data.attrs[k]
-                    data.to_dataset(name=varname).to_netcdf(file, mode=mode)
+                    data.to_dataset(name=varname).to_netcdf(file, mode=mode, unlimited_dims=unlimited_dims)
                     return
 
-                arr_valid = arr[valid_mask]
-                scale, offset = _calculate_scale_and_offset(arr_valid, convert_dtype)
-
-                # 创建需要转换的数据副本，但不修改特殊值
-                arr_to_save = arr.copy()
-                
-                # 只处理自定义缺失值，转换为NaN（让后面统一处理）
-                if data_missing_val is not None:
-                    arr_to_save[arr == data_missing_val] = np.nan
+                scale, offset = _scale_offset_from_min_max(data_min, data_max, convert_dtype)
 
-                # 进行压缩转换（_data_to_scale_offset会正确处理NaN和掩码）
-                new_values, fill_value = _data_to_scale_offset(arr_to_save, scale, offset, convert_dtype)
+                # 进行压缩转换（_data_to_scale_offset会正确处理NaN、掩码和自定义缺失值，无需额外副本）
+                new_values, fill_value = _data_to_scale_offset(arr, scale, offset, convert_dtype, data_missing_val)
                 new_da = data.copy(data=new_values)
                 
                 # 清除原有的填充值属性，设置新的压缩属性
@@ -196,75 +911,48 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
                 new_da.attrs["scale_factor"] = float(scale)
                 new_da.attrs["add_offset"] = float(offset)
                 
-                encoding[varname] = {
-                    "zlib": compile_switch,
-                    "complevel": 4,
-                    "dtype": nc_dtype,
-                    "_FillValue": fill_value,  # 使用计算出的填充值
-                }
-                new_da.to_dataset(name=varname).to_netcdf(file, mode=mode, encoding=encoding)
+                encoding[varname] = _compression_encoding(varname, new_da.dims, new_da.shape, new_values.dtype.itemsize, compile_switch, compression_options, chunking)
+                encoding[varname]["dtype"] = nc_dtype
+                encoding[varname]["_FillValue"] = fill_value  # 使用计算出的填充值
+                new_da.to_dataset(name=varname).to_netcdf(file, mode=mode, encoding=encoding, unlimited_dims=unlimited_dims)
             else:
                 # 对于非数值数据或不压缩的情况，移除填充值属性防止冲突
                 for k in ["_FillValue", "missing_value"]:
                     if k in data.attrs:
                         del data.attrs[k]
-                data.to_dataset(name=varname).to_netcdf(file, mode=mode)
+                if np.issubdtype(arr.dtype, np.number):
+                    # 不打包的数值数据仍按 compile_switch/compression_options/chunking 做无损压缩
+                    encoding[varname] = _compression_encoding(varname, data.dims, data.shape, arr.dtype.itemsize, compile_switch, compression_options, chunking)
+                data.to_dataset(name=varname).to_netcdf(file, mode=mode, encoding=encoding or None, unlimited_dims=unlimited_dims)
             return
 
         else:  # Dataset 情况
+            # 各变量的掩码和压缩转换相互独立，且 NumPy 运算会释放 GIL，可用线程池并行处理
+            var_names = list(data.data_vars)
+
+            def _pack(var):
+                return _pack_dataset_var(data[var], convert_dtype, scale_offset_switch, compile_switch, compression_options, chunking, keepbits, verify, tolerance)
+
+            if workers is not None and workers > 1 and len(var_names) > 1:
+                with ThreadPoolExecutor(max_workers=min(workers, len(var_names))) as executor:
+                    packed = list(executor.map(_pack, var_names))
+            else:
+                packed = [_pack(var) for var in var_names]
+
             new_vars = {}
             encoding = {}
-            for var in data.data_vars:
-                da = data[var]
-                arr = np.array(da.values)
-                data_missing_val = da.attrs.get("missing_value", None)
-
-                valid_mask = np.ones(arr.shape, dtype=bool)
-                if arr.dtype.kind in ["f", "i", "u"]:
-                    valid_mask = np.isfinite(arr)
-                    if data_missing_val is not None:
-                        valid_mask &= arr != data_missing_val
-                    if hasattr(arr, "mask"):
-                        valid_mask &= ~arr.mask
-
-                attrs = da.attrs.copy()
-                for k in ["_FillValue", "missing_value"]:
-                    if k in attrs:
-                        del attrs[k]
-
-                if np.issubdtype(arr.dtype, np.number) and scale_offset_switch:
-                    # 处理边缘情况：检查是否有有效数据
-                    if not np.any(valid_mask):
-                        # 如果没有有效数据，创建一个简单的拷贝，不做转换
-                        new_vars[var] = xr.DataArray(arr, dims=da.dims, coords=da.coords, attrs=attrs)
-                        continue
-
-                    arr_valid = arr[valid_mask]
-                    scale, offset = _calculate_scale_and_offset(arr_valid, convert_dtype)
-                    arr_to_save = arr.copy()
-
-                    # 只处理自定义缺失值，转换为NaN（让后面统一处理）
-                    if data_missing_val is not None:
-                        arr_to_save[arr == data_missing_val] = np.nan
-                    
-                    # 进行压缩转换（_data_to_scale_offset会正确处理NaN和掩码）
-                    new_values, fill_value = _data_to_scale_offset(arr_to_save, scale, offset, convert_dtype)
-                    new_da = xr.DataArray(new_values, dims=da.dims, coords=da.coords, attrs=attrs)
-                    new_da.attrs["scale_factor"] = float(scale)
-                    new_da.attrs["add_offset"] = float(offset)
-                    new_vars[var] = new_da
-                    encoding[var] = {
-                        "zlib": compile_switch,
-                        "complevel": 4,
-                        "dtype": nc_dtype,
-                        "_FillValue": fill_value,  # 使用计算出的填充值
-                    }
-                else:
-                    new_vars[var] = xr.DataArray(arr, dims=da.dims, coords=da.coords, attrs=attrs)
+            report = {}
+            for var, (new_da, var_encoding, var_report) in zip(var_names, packed):
+                new_vars[var] = new_da
+                if var_encoding is not None:
+                    encoding[var] = var_encoding
+                if var_report is not None:
+                    report[var] = var_report
 
             # 确保坐标变量被正确复制
             new_ds = xr.Dataset(new_vars, coords=data.coords.copy())
-            new_ds.to_netcdf(file, mode=mode, encoding=encoding if encoding else None)
+            new_ds.to_netcdf(file, mode=mode, encoding=encoding if encoding else None, unlimited_dims=unlimited_dims)
+            return report if keepbits is not None or verify else None
         return
 
     # 处理纯 numpy 数组情况
@@ -282,6 +970,7 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
         if missing_value is None:
             missing_value = getattr(data, "missing_value", None)
     
+    report = {} if keepbits is not None or verify else None
     try:
         with nc.Dataset(file, mode, format="NETCDF4") as ncfile:
             if coords is not None:
@@ -292,43 +981,51 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
                         var_obj[:] = values
 
             dims = list(coords.keys()) if coords else []
-            if is_numeric and scale_offset_switch:
+            if keepbits is not None and np.issubdtype(data.dtype, np.floating):
+                # 位舍入：保留 float32，不使用 scale_factor/add_offset
+                var_encoding = _compression_encoding(varname, dims, data.shape, 4, compile_switch, compression_options, chunking)
+                rounded = _bitround(data, keepbits, missing_value)
+                stats = {}
+                _update_bitround_stats(stats, data, rounded, var_encoding.get("complevel", 4))
+                report = {varname: _bitround_report(stats, keepbits)}
+                var = ncfile.createVariable(varname, "f4", dims, **var_encoding)
+                var[:] = rounded
+            elif is_numeric and scale_offset_switch and keepbits is None:
                 arr = np.array(data)
 
-                # 构建有效掩码，但不排除掩码区域的数值（如果 preserve_mask_values 为 True）
-                valid_mask = np.isfinite(arr)  # 排除 NaN 和无限值
-                if missing_value is not None:
-                    valid_mask &= arr != missing_value  # 排除明确的缺失值
-
-                # 如果不保留掩码区域的值，则将掩码区域视为无效
-                if not preserve_mask_values and hasattr(arr, "mask"):
-                    valid_mask &= ~arr.mask
-
-                arr_to_save = arr.copy()
+                # 有效数据范围：排除 NaN、无限值和明确的缺失值（NaN 感知归约，不产生有效数据拷贝）
+                data_min, data_max = _finite_min_max(arr, missing_value)
 
                 # 确保有有效数据
-                if not np.any(valid_mask):
+                if data_min is None:
                 # 如果没有有效数据，不进行压缩，直接保存原始数据类型
                     dtype = _numpy_to_nc_type(data.dtype)
                     var = ncfile.createVariable(varname, dtype, dims, zlib=False)
                     # 确保没有 NaN，直接用0替换
                     clean_data = np.nan_to_num(data, nan=0.0)
                     var[:] = clean_data
-                    return                # 计算 scale 和 offset 仅使用有效区域数据
-                arr_valid = arr_to_save[valid_mask]
-                scale, offset = _calculate_scale_and_offset(arr_valid, convert_dtype)
-
-                # 只处理自定义缺失值，转换为NaN
-                if missing_value is not None:
-                    arr_to_save[arr == missing_value] = np.nan
+                    if verify:
+                        report = {varname: _unpacked_report(data.dtype)}
+                    return report
+                # 计算 scale 和 offset 仅使用有效区域数据
+                if tolerance is not None:
+                    convert_dtype = _choose_pack_dtype(data_min, data_max, tolerance, convert_dtype)
+                    nc_dtype = _numpy_to_nc_type(convert_dtype)
+                scale, offset = _scale_offset_from_min_max(data_min, data_max, convert_dtype)
 
-                # 执行压缩转换（_data_to_scale_offset会正确处理NaN和掩码）
-                new_data, fill_value = _data_to_scale_offset(arr_to_save, scale, offset, convert_dtype)
+                # 执行压缩转换（_data_to_scale_offset会正确处理NaN、掩码和自定义缺失值）
+                stats = {} if verify else None
+                new_data, fill_value = _data_to_scale_offset(arr, scale, offset, convert_dtype, missing_value, stats=stats)
+                if verify:
+                    report = {varname: _pack_report(stats, convert_dtype, scale, offset, data_min, data_max)}
 
                 # 创建变量并设置属性
-                var = ncfile.createVariable(varname, nc_dtype, dims, zlib=compile_switch, fill_value=fill_value)
+                var_encoding = _compression_encoding(varname, dims, new_data.shape, new_data.dtype.itemsize, compile_switch, compression_options, chunking)
+                var = ncfile.createVariable(varname, nc_dtype, dims, fill_value=fill_value, **var_encoding)
                 var.scale_factor = scale
                 var.add_offset = offset
+                # new_data 已是压缩后的整型，关闭 netCDF4 的自动缩放，避免重复压缩
+                var.set_auto_maskandscale(False)
                 var[:] = new_data
             else:
                 # 非压缩情况，直接保存但要处理特殊值
@@ -350,20 +1047,84 @@ def save_to_nc(file, data, varname=None, coords=None, mode="w", convert_dtype='i
                 if hasattr(data, "mask") and np.ma.is_masked(data):
                     clean_data[data.mask] = np.nan
                 
-                # 创建变量
-                var = ncfile.createVariable(varname, dtype, dims, zlib=False)
+                # 创建变量（关闭 scale_offset_switch 的数值数据仍按 compile_switch/compression_options/chunking 做无损压缩）
+                var_encoding = {"zlib": False}
+                if is_numeric and not scale_offset_switch:
+                    var_encoding = _compression_encoding(varname, dims, data.shape, data.dtype.itemsize, compile_switch, compression_options, chunking)
+                var = ncfile.createVariable(varname, dtype, dims, **var_encoding)
                 var[:] = clean_data
         # 只对压缩数据调用_nan_to_fillvalue，处理掩码但保持NaN
         if is_numeric and scale_offset_switch:
             pass  # 简化策略：不再需要后处理
     except Exception as e:
         raise RuntimeError(f"netCDF4 保存失败: {str(e)}") from e
+    return report
+
+
+
+
+def _legacy_data_to_scale_offset(data, scale, offset, dtype="int32"):
+    """
+    旧版（非融合）压缩转换实现，仅供 _benchmark_data_to_scale_offset 对比使用。
+    """
+    np_dtype, clip_min, clip_max = _get_dtype_info(dtype)
+    result = np.full(data.shape, clip_min, dtype=np_dtype)
+    valid_mask = np.isfinite(data)
+    if np.any(valid_mask):
+        scaled_int = np.round((data[valid_mask] - offset) / scale).astype(np_dtype)
+        result[valid_mask] = np.clip(scaled_int, clip_min + 1, clip_max)
+    return result, clip_min
+
+
+def _benchmark_worker(method, size, dtype, queue):
+    """
+    在独立进程中运行一次压缩转换，返回耗时和相对于输入数据的峰值 RSS 增量（MB）。
+    """
+    import resource
+    import time
+
+    data = np.random.default_rng(0).random(size, dtype=np.float32)
+    data *= 100
+    data[::1000] = np.nan
+    scale, offset = _calculate_scale_and_offset(data, dtype)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "fused":
+        _data_to_scale_offset(data, scale, offset, dtype)
+    else:
+        _legacy_data_to_scale_offset(data, scale, offset, dtype)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, (rss_after - rss_before) / 1024))
 
 
+def _benchmark_data_to_scale_offset(size=int(1e9), dtype="int16"):
+    """
+    对比旧版与融合版压缩转换在 size 个 float32 元素上的耗时和峰值内存（仅 Linux/macOS，需要 resource 模块）。
+    每种实现在单独的进程中运行，避免峰值 RSS 相互影响。默认 1e9 个元素约需 4 GB 输入内存。
+    """
+    import multiprocessing as mp
+
+    ctx = mp.get_context("spawn")
+    for method in ["legacy", "fused"]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_benchmark_worker, args=(method, size, dtype, queue))
+        proc.start()
+        elapsed, peak_mb = queue.get()
+        proc.join()
+        print(f"{method:>6}: {elapsed:8.2f} s, peak RSS above input: {peak_mb:10.1f} MB")
 
 
 # 测试用例
 if __name__ == "__main__":
+    import sys
+
+    # 压缩转换性能对比：python -m oafuncs._script.netcdf_write --benchmark [元素个数]（1e9 个 float32 元素约需 4 GB 以上内存）
+    if "--benchmark" in sys.argv:
+        args = sys.argv[sys.argv.index("--benchmark") + 1 :]
+        _benchmark_data_to_scale_offset(int(float(args[0])) if args else int(1e9), "int16")
+        sys.exit(0)
+
     # 示例文件路径，需根据实际情况修改
     file = "dataset_test.nc"
     ds = xr.open_dataset(file)
@@ -3,15 +3,106 @@ import multiprocessing as mp
 import platform
 import threading
 import time
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
+import numpy as np
 import psutil
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-__all__ = ["ParallelExecutor"]
+__all__ = ["ParallelExecutor", "SharedArray"]
+
+# 子进程中已附加的共享内存：名称 -> (SharedMemory, 只读视图)，只保留最近使用的几个
+_ATTACHED: "OrderedDict[str, Tuple[Any, np.ndarray]]" = OrderedDict()
+_MAX_ATTACHED = 16
+# 随任务下发给工作进程的最近释放的共享内存名称个数
+_MAX_RELEASED = 64
+
+
+class SharedArray:
+    """
+    放在 multiprocessing.shared_memory 中的 NumPy 数组句柄。
+    序列化时只传递名称、形状和类型，任务参数中的句柄在工作进程里被替换为附加到同一块内存的只读视图，不复制数据
+    """
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self._shm = None
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> "SharedArray":
+        from multiprocessing import shared_memory
+
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError("Arrays of Python objects cannot be placed in shared memory.")
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        handle = cls(shm.name, array.shape, array.dtype.str)
+        handle._shm = shm
+        return handle
+
+    def __getstate__(self):
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["shape"], state["dtype"])
+
+    def array(self) -> np.ndarray:
+        """附加到共享内存并返回只读视图（同一进程中重复使用）"""
+        if self.name in _ATTACHED:
+            _ATTACHED.move_to_end(self.name)
+            return _ATTACHED[self.name][1]
+        from multiprocessing import shared_memory
+
+        shm = self._shm or shared_memory.SharedMemory(name=self.name)
+        view = np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        _ATTACHED[self.name] = (shm, view)
+        while len(_ATTACHED) > _MAX_ATTACHED:
+            _ATTACHED.popitem(last=False)
+        return view
+
+    def close(self):
+        """由创建者调用：释放并删除共享内存"""
+        _ATTACHED.pop(self.name, None)
+        if self._shm is not None:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            try:
+                self._shm.close()
+            except BufferError:
+                # 仍有视图在使用，内存在视图释放后回收
+                pass
+            self._shm = None
+
+
+def _drop_attached(names: Iterable[str]):
+    """关闭当前进程中对已释放共享内存的附加，使其内存可以被回收"""
+    for name in names:
+        entry = _ATTACHED.pop(name, None)
+        if entry is None:
+            continue
+        shm = entry[0]
+        del entry
+        try:
+            shm.close()
+        except BufferError:
+            # 任务仍持有视图，视图释放后内存回收
+            pass
+
+
+def _call_shared(func: Callable, *args, released: Tuple[str, ...] = ()) -> Any:
+    """先丢弃 released 中已释放的共享内存，再将参数中的 SharedArray 句柄替换为只读数组后调用 func"""
+    _drop_attached(released)
+    return func(*(arg.array() if isinstance(arg, SharedArray) else arg for arg in args))
 
 
 class ParallelExecutor:
@@ -23,8 +114,20 @@ class ParallelExecutor:
         mem_per_process: float = 3.0,  # GB
         timeout_per_task: int = 3600,
         max_retries: int = 3,
+        persistent: bool = False,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        max_tasks_per_child: Optional[int] = None,
     ):
         self.platform = self._detect_platform()
+        # persistent 为 True 时工作进程在多次 run/imap 之间保持存活，直到 shutdown；
+        # initializer(*initargs) 在每个工作进程启动时执行一次，用于预加载重型状态；
+        # max_tasks_per_child：平均每个工作进程完成多少个任务后换一批新进程 (按提交给进程池的任务总数计，是平均值而不是单个进程的上限)，
+        # initializer 会在新进程中重新执行，用于限制内存泄漏
+        self.persistent = persistent
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_tasks_per_child = max_tasks_per_child
         self.mem_per_process = mem_per_process
         self.timeout_per_task = timeout_per_task
         self.max_retries = max_retries
@@ -32,6 +135,9 @@ class ParallelExecutor:
         self.task_history = []
         self._executor = None
         self._shutdown_called = False
+        self._shared = []
+        self._released = deque(maxlen=_MAX_RELEASED)
+        self._submitted = 0  # 当前进程池已提交的任务数，用于按任务数回收工作进程
 
         self.mode, default_workers = self._determine_optimal_settings()
         self.max_workers = max_workers or default_workers
@@ -93,11 +199,28 @@ class ParallelExecutor:
             self._executor = None
 
     def _get_executor(self):
+        # 常驻进程池中有进程异常退出时，进程池不可再用，需要重建
+        if self._executor and getattr(self._executor, "_broken", False):
+            self._restart_executor()
+        # 提交的任务数达到 max_tasks_per_child * max_workers 时换一个新的进程池；旧进程池在后台完成已提交的任务后退出。
+        # 不使用 ProcessPoolExecutor 自带的 max_tasks_per_child：Python 3.11/3.12 中进程池空闲时退出的工作进程不会被补上，后续任务会一直挂起
+        if self._executor and self.max_tasks_per_child and self._submitted >= self.max_tasks_per_child * self.max_workers:
+            self._restart_executor()
         if not self._executor:
             Executor = ThreadPoolExecutor if self.mode == "thread" else ProcessPoolExecutor
-            self._executor = Executor(max_workers=self.max_workers, mp_context=self.mp_context if self.mode == "process" else None)
+            kwargs = {"mp_context": self.mp_context} if self.mode == "process" else {}
+            self._executor = Executor(max_workers=self.max_workers, initializer=self.initializer, initargs=self.initargs, **kwargs)
+            self._submitted = 0
+            if self.mode == "process":
+                # 新的工作进程没有附加任何共享内存
+                self._released.clear()
         return self._executor
 
+    def _release_executor(self):
+        # 常驻模式下保留进程池供下一次调用使用，否则关闭
+        if not self.persistent:
+            self._close_executor()
+
     def run(self, func: Callable, params: List[Tuple], chunk_size: Optional[int] = None) -> List[Any]:
         chunk_size = chunk_size or self.chunk_size
         try:
@@ -112,14 +235,81 @@ class ParallelExecutor:
                     self._handle_failure()
             raise RuntimeError(f"Failed after {self.max_retries} retries")
         finally:
-            # 仅关闭当前 executor，保留资源监控等运行状态
-            if self._executor:
-                try:
-                    self._executor.shutdown(wait=True)
-                except Exception as e:
-                    logging.error(f"Executor shutdown error: {e}")
-                finally:
-                    self._executor = None
+            self._release_executor()
+
+    def imap(self, func: Callable, params: Iterable[Tuple], ordered: bool = True, max_in_flight: Optional[int] = None) -> Iterator[Any]:
+        """
+        逐个产出 func(*args) 的结果：按需从 params（可以是生成器）中取参数，同时在途的任务不超过 max_in_flight 个，
+        内存只与在途窗口有关。ordered 为 True 时按输入顺序产出，否则按完成顺序产出。出错的任务产出 None（同 run）
+        """
+        max_in_flight = max_in_flight or 2 * self.max_workers
+        params = iter(params)
+        pending = deque() if ordered else {}
+
+        def submit():
+            for args in params:
+                # 每次提交前取进程池，长时间的流式任务中也能按 max_tasks_per_child 回收工作进程
+                future = self._get_executor().submit(_call_shared, func, *args, released=tuple(self._released))
+                self._submitted += 1
+                if ordered:
+                    pending.append((future, args))
+                else:
+                    pending[future] = args
+                return True
+            return False
+
+        def result(future, args):
+            try:
+                return future.result(timeout=self.timeout_per_task)
+            except Exception as e:
+                return self._handle_error(e, func, args)
+
+        try:
+            while len(pending) < max_in_flight and submit():
+                pass
+            while pending:
+                if ordered:
+                    yield result(*pending.popleft())
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield result(future, pending.pop(future))
+                while len(pending) < max_in_flight and submit():
+                    pass
+        finally:
+            # 提前停止迭代时取消尚未开始的任务
+            for future in pending:
+                (future[0] if ordered else future).cancel()
+            self._release_executor()
+
+    def share(self, array: np.ndarray) -> SharedArray:
+        """
+        把数组放入共享内存一次，返回可放在任意多个任务参数中的句柄；工作进程中得到只读视图而不是各自的副本。
+        适用于所有任务共用的大数组（如网格坐标），也适用于按任务取子集的大数组。共享内存在 release 或 shutdown 时释放
+        """
+        handle = SharedArray.create(array)
+        self._shared.append(handle)
+        return handle
+
+    def release(self, handle: SharedArray):
+        """
+        立即释放 share 创建的共享内存（常驻进程池中每一步都 share 新数组时，用完即释放）。
+        工作进程在收到下一个任务时关闭对它的附加
+        """
+        if handle in self._shared:
+            self._shared.remove(handle)
+        handle.close()
+        self._released.append(handle.name)
+
+    def _close_executor(self):
+        # 仅关闭当前 executor，保留资源监控等运行状态
+        if self._executor:
+            try:
+                self._executor.shutdown(wait=True)
+            except Exception as e:
+                logging.error(f"Executor shutdown error: {e}")
+            finally:
+                self._executor = None
 
     def _execute_batch(self, func: Callable, params: List[Tuple], chunk_size: int) -> List[Any]:
         from oafuncs.oa_tool import pbar
@@ -142,19 +332,21 @@ class ParallelExecutor:
         # 手动开始任务
         progress_bar.task.start()
         
-        with self._get_executor() as executor:
-            futures = {executor.submit(func, *args): idx for idx, args in enumerate(params)}
+        executor = self._get_executor()
+        released = tuple(self._released)
+        futures = {executor.submit(_call_shared, func, *args, released=released): idx for idx, args in enumerate(params)}
+        self._submitted += len(params)
+        
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx] = future.result(timeout=self.timeout_per_task)
+            except Exception as e:
+                results[idx] = self._handle_error(e, func, params[idx])
             
-            for future in as_completed(futures):
-                idx = futures[future]
-                try:
-                    results[idx] = future.result(timeout=self.timeout_per_task)
-                except Exception as e:
-                    results[idx] = self._handle_error(e, func, params[idx])
-                
-                # 实时更新进度条
-                progress_bar.update(1)
-                progress_bar.refresh()
+            # 实时更新进度条
+            progress_bar.update(1)
+            progress_bar.refresh()
         # 完成后换行
         print()
         return results
@@ -175,29 +367,31 @@ class ParallelExecutor:
         )
         progress_bar.task.start()
         
-        with self._get_executor() as executor:
-            futures = []
-            for i in range(0, len(params), chunk_size):
-                chunk = params[i : i + chunk_size]
-                futures.append(executor.submit(self._process_chunk, func, chunk))
-
-            for future in as_completed(futures):
-                try:
-                    results.extend(future.result(timeout=self.timeout_per_task))
-                except Exception as e:
-                    logging.error(f"Chunk failed: {e}")
-                    results.extend([None] * chunk_size)
-                
-                # 更新分块进度
-                progress_bar.update(1)
-                progress_bar.refresh()
+        executor = self._get_executor()
+        futures = []
+        for i in range(0, len(params), chunk_size):
+            chunk = params[i : i + chunk_size]
+            futures.append(executor.submit(self._process_chunk, func, chunk, tuple(self._released)))
+        self._submitted += len(params)
+
+        for future in as_completed(futures):
+            try:
+                results.extend(future.result(timeout=self.timeout_per_task))
+            except Exception as e:
+                logging.error(f"Chunk failed: {e}")
+                results.extend([None] * chunk_size)
+            
+            # 更新分块进度
+            progress_bar.update(1)
+            progress_bar.refresh()
         # 完成后换行
         print()
         return results
 
     @staticmethod
-    def _process_chunk(func: Callable, chunk: List[Tuple]) -> List[Any]:
-        return [func(*args) for args in chunk]
+    def _process_chunk(func: Callable, chunk: List[Tuple], released: Tuple[str, ...] = ()) -> List[Any]:
+        _drop_attached(released)
+        return [_call_shared(func, *args) for args in chunk]
 
     def _update_settings(self, duration: float, task_count: int):
         self.task_history.append((duration, task_count))
@@ -231,6 +425,9 @@ class ParallelExecutor:
                 logging.error(f"Shutdown error: {e}")
             finally:
                 self._executor = None
+        for handle in self._shared:
+            handle.close()
+        self._shared = []
 
     def __enter__(self):
         return self
@@ -5,7 +5,7 @@ import numpy as np
 import xarray as xr
 from rich import print
 
-__all__ = ["save", "merge", "modify", "rename", "check", "convert_longitude", "isel", "draw", "compress", "unscale"]
+__all__ = ["save", "merge", "open_merged", "modify", "rename", "edit", "edit_many", "check", "check_many", "convert_longitude", "isel", "draw", "compress", "compress_many", "unscale"]
 
 
 
@@ -20,7 +20,17 @@ def save(
     use_compression: bool = True,
     preserve_mask_values: bool = True,
     missing_value: Optional[Union[float, int]] = None,
-) -> None:
+    streaming: bool = False,
+    chunk_budget_mb: float = 256,
+    workers: Optional[int] = None,
+    compression_options: Optional[dict] = None,
+    chunking: Optional[str] = None,
+    append_dim: Optional[str] = None,
+    significant_bits: Optional[int] = None,
+    significant_digits: Optional[int] = None,
+    verify: bool = False,
+    tolerance: Optional[float] = None,
+) -> Optional[dict]:
     """
     Write data to a NetCDF file.
 
@@ -34,17 +44,44 @@ def save(
         use_scale_offset (bool): Whether to use scale_factor and add_offset. Default is True.
         use_compression (bool): Whether to use compression parameters. Default is True.
         preserve_mask_values (bool): Whether to preserve mask values. Default is True.
+        missing_value (Optional[Union[float, int]]): Custom missing value to be treated as NaN.
+        streaming (bool): Write xarray data slab by slab along the leading dimension, so dask-backed or lazily opened variables larger than RAM never load at once. Default is False.
+        chunk_budget_mb (float): Memory budget (MB) of one slab in streaming mode. Default is 256.
+        workers (Optional[int]): Number of threads used to pack the data variables of a Dataset concurrently. Default is None (one by one).
+        compression_options (Optional[dict]): "compression" (e.g. 'zlib', 'zstd', 'blosc_lz4'), "complevel", "shuffle" and "chunksizes" for packed or bit-rounded variables. A sub-dict keyed by variable name overrides them for that variable. Codecs unsupported by netCDF-C fall back to zlib. Default is None (zlib, complevel 4).
+        chunking (Optional[str]): Automatic chunk shape policy, 'map' (one time step per chunk), 'timeseries' (long time axis, small spatial tiles) or 'auto' (balanced). Default is None (netCDF library defaults).
+        append_dim (Optional[str]): Append the records of xarray data along this unlimited dimension of an existing file, writing only the new slices. Packed variables are re-encoded in place if their scale_factor/add_offset cannot cover the new values. If the file does not exist it is created with this dimension unlimited. Default is None.
+        significant_bits (Optional[int]): Keep floating-point variables as float32 and round away all but this many mantissa bits (BitRound) instead of scale_factor/add_offset packing, so zlib compresses much better. Default is None.
+        significant_digits (Optional[int]): Same as significant_bits, given as significant decimal digits. Default is None.
+        verify (bool): Measure the quantization error of each packed variable while it is encoded (no read-back, no extra copy of the data). Default is False.
+        tolerance (Optional[float]): Maximum absolute error allowed. Each packed variable uses the smallest of int8/int16/int32 that meets it, overriding convert_dtype, and the error report is returned. Not used when appending to an existing file. Default is None.
+
+    Returns:
+        Optional[dict]: With significant_bits/significant_digits, a per-variable report {"keepbits", "ratio_estimate", "max_abs_error", "max_rel_error"}, where ratio_estimate is the shuffle+zlib ratio estimated on a sample of the rounded data, not the measured on-disk ratio. With verify/tolerance, a per-variable report {"dtype", "scale_factor", "add_offset", "max_abs_error", "mean_abs_error", "max_rel_error"}, where max_rel_error is relative to the data range. Otherwise None.
 
     Example:
         >>> save(r'test.nc', data, 'u', {'time': np.linspace(0, 120, 100), 'lev': np.linspace(0, 120, 50)}, 'a')
         >>> save(r'test.nc', data, 'u', {'time': np.linspace(0, 120, 100), 'lev': np.linspace(0, 120, 50)}, 'w')
         >>> save(r'test.nc', data, 'u', {'time': np.linspace(0, 120, 100), 'lev': np.linspace(0, 120, 50)}, 'w', use_scale_offset=False, use_compression=False)
         >>> save(r'test.nc', data)
+        >>> save(r'test.nc', xr.open_dataset('big.nc', chunks={'time': 1}), streaming=True, chunk_budget_mb=512)
+        >>> save(r'test.nc', ds, workers=8)
+        >>> save(r'test.nc', ds, compression_options={'compression': 'zstd', 'complevel': 6, 'u': {'chunksizes': (365, 10, 10)}}, chunking='timeseries')
+        >>> save(r'monthly.nc', hourly_ds, append_dim='time')
+        >>> report = save(r'test.nc', ds, significant_digits=3)
+        >>> report = save(r'test.nc', ds, tolerance=0.01)
     """
     from ._script.netcdf_write import save_to_nc
 
-    save_to_nc(file_path, data, variable_name, coordinates, write_mode, convert_dtype,use_scale_offset, use_compression, preserve_mask_values, missing_value)
+    report = save_to_nc(file_path, data, variable_name, coordinates, write_mode, convert_dtype,use_scale_offset, use_compression, preserve_mask_values, missing_value, streaming, chunk_budget_mb, workers, compression_options, chunking, append_dim, significant_bits, significant_digits, verify, tolerance)
     print(f"[green]Data successfully saved to {file_path}[/green]")
+    if report:
+        for var, stats in report.items():
+            if "keepbits" in stats:
+                print(f"[cyan]{var}: keepbits={stats['keepbits']}, ratio≈{stats['ratio_estimate']:.2f}, max abs error={stats['max_abs_error']:.3g}, max rel error={stats['max_rel_error']:.3g}[/cyan]")
+            else:
+                print(f"[cyan]{var}: {stats['dtype']}, max abs error={stats['max_abs_error']:.3g}, mean abs error={stats['mean_abs_error']:.3g}, max rel error={stats['max_rel_error']:.3g}[/cyan]")
+    return report
 
 
 def merge(
@@ -52,6 +89,16 @@ def merge(
     variable_names: Optional[Union[str, List[str]]] = None,
     merge_dimension: Optional[str] = None,
     output_file: Optional[str] = None,
+    streaming: bool = False,
+    chunk_budget_mb: float = 256,
+    workers: Optional[int] = None,
+    sort: bool = False,
+    duplicates: Optional[str] = None,
+    virtual: bool = False,
+    isel: Optional[dict] = None,
+    sel: Optional[dict] = None,
+    resume: bool = True,
+    group_size: Optional[int] = None,
 ) -> None:
     """
     Merge multiple NetCDF files into one.
@@ -61,16 +108,52 @@ def merge(
         variable_names (Optional[Union[str, List[str]]]): Variable names to merge.
         merge_dimension (Optional[str]): Dimension name to merge along.
         output_file (Optional[str]): Output file name.
+        streaming (bool): Read only the file headers first, preallocate the output and copy one input file at a time slab by slab, so memory does not grow with the number of files. Default is False.
+        chunk_budget_mb (float): Memory budget (MB) of one slab in streaming mode. Default is 256.
+        workers (Optional[int]): In streaming mode, number of processes that scan the file headers (cached by path, size and modification time) and read the inputs ahead, while a single writer keeps the file order. Default is None (sequential).
+        sort (bool): Order the records by the merge coordinate taken from the file headers, so out-of-order inputs give a monotonic axis. Implies streaming. Default is False.
+        duplicates (Optional[str]): Drop records whose merge coordinate repeats, keeping the 'first' or 'last' occurrence in file_paths order. Implies streaming. Gaps in the merged axis are reported. Default is None.
+        virtual (bool): Copy no data; write only a small JSON index (file path, offsets and lengths along merge_dimension) to output_file, built from the file headers. Open it lazily with open_merged(). Default is False.
+        isel (Optional[dict]): Index selection on dimensions other than merge_dimension (int, slice or list of ints). It is read as hyperslabs from each input, so only the selected bytes are read and decompressed. Implies streaming. Default is None.
+        sel (Optional[dict]): Like isel, but with coordinate values (exact value, list of values or a value range slice) resolved on the first file. Default is None.
+        resume (bool): In streaming mode the output is written to output_file + '.part' and renamed atomically when complete, with a checkpoint of finished input files. If True, rerunning an interrupted merge of the same inputs continues from that checkpoint. Default is True.
+        group_size (Optional[int]): Merge as a tree for very large file counts: a pool of `workers` processes merges groups of at most group_size files into temporary files in parallel, level by level, and the last level is copied into output_file as raw integers. Memory per process is about one input file. Default is None (single writer).
 
     Example:
         merge(['file1.nc', 'file2.nc'], variable_names='temperature', merge_dimension='time', output_file='merged.nc')
+        merge(file_list, merge_dimension='time', output_file='merged.nc', streaming=True)
+        merge(file_list, merge_dimension='time', output_file='merged.nc', streaming=True, workers=8)
+        merge(file_list, merge_dimension='time', output_file='merged.nc', sort=True, duplicates='last')
+        merge(file_list, merge_dimension='time', output_file='merged.json', virtual=True)
+        merge(file_list, merge_dimension='time', output_file='merged.nc', workers=16, group_size=64)
+        merge(file_list, 'u', 'time', 'box.nc', sel={'lat': slice(10, 30), 'lon': slice(100, 130)}, isel={'depth': [0, 5, 9]})
     """
     from ._script.netcdf_merge import merge_nc
 
-    merge_nc(file_paths, variable_names, merge_dimension, output_file)
+    merge_nc(file_paths, variable_names, merge_dimension, output_file, streaming, chunk_budget_mb, workers, sort, duplicates, virtual, isel, sel, resume, group_size)
     print(f"[green]Files successfully merged into {output_file}[/green]")
 
 
+def open_merged(index_file: str, chunks: Optional[dict] = None) -> xr.Dataset:
+    """
+    Open a virtual merge written by merge(..., virtual=True) as one lazy Dataset over the original files.
+
+    Args:
+        index_file (str): JSON index written by merge(..., virtual=True).
+        chunks (Optional[dict]): Dask chunks used to open each file. Default is None (one chunk per file variable).
+
+    Returns:
+        xr.Dataset: Merged dataset backed by dask; data is only read when sliced or computed.
+
+    Example:
+        >>> ds = open_merged('merged.json')
+        >>> ds['u'].sel(time='2024-03-01').load()
+    """
+    from ._script.netcdf_merge import open_merged_nc
+
+    return open_merged_nc(index_file, chunks)
+
+
 def modify(
     file_path: str,
     variable_name: str,
@@ -133,6 +216,56 @@ def rename(
         print(f"[red]An error occurred: {e}[/red]")
 
 
+def edit(
+    file_path: str,
+    edits: dict,
+) -> bool:
+    """
+    Apply many variable, attribute and rename edits to a NetCDF file in one 'r+' session.
+
+    Args:
+        file_path (str): Path to the NetCDF file.
+        edits (dict): Edits grouped by kind, applied in the order values -> attrs -> rename, always using the names before renaming:
+            "values": {variable: new_value},
+            "attrs": {variable: {attribute: value}}, with variable None for global attributes and value None to delete the attribute,
+            "rename": {old_name: new_name} for variables and/or dimensions.
+            All names are checked first, so an invalid edit leaves the file unchanged.
+
+    Returns:
+        bool: True if all edits were applied.
+
+    Example:
+        >>> edit('file.nc', {'attrs': {'temp': {'units': 'degC'}, None: {'title': 'HYCOM'}}, 'rename': {'temp': 'temperature'}})
+    """
+    from ._script.netcdf_modify import edit_nc
+
+    return edit_nc(file_path, edits)
+
+
+def edit_many(
+    pattern: Union[str, List[str]],
+    edits: dict,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Apply the same edits (see edit()) to many NetCDF files, with one 'r+' session per file.
+
+    Args:
+        pattern (Union[str, List[str]]): Glob pattern (``**`` is recursive), directory or list of files.
+        edits (dict): Edits applied to every file, see edit().
+        workers (Optional[int]): Number of processes editing files in parallel. Default is None (sequential).
+
+    Returns:
+        dict: Counts of "edited" and "failed" files and per-file results under "files".
+
+    Example:
+        >>> edit_many(r'/data/hycom/**/*.nc', {'attrs': {'u': {'units': 'm/s'}}}, workers=8)
+    """
+    from ._script.netcdf_modify import edit_many_nc
+
+    return edit_many_nc(pattern, edits, workers)
+
+
 def check(
     file_path: str,
     delete_if_invalid: bool = False,
@@ -188,6 +321,41 @@ def check(
     return is_valid
 
 
+def check_many(
+    pattern: Union[str, List[str]],
+    deep: bool = False,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    cache_file: Optional[str] = None,
+    delete_if_invalid: bool = False,
+    print_messages: bool = True,
+) -> dict:
+    """
+    Check many NetCDF files, e.g. a whole download archive.
+
+    Results are cached by (path, size, modification time) in a small JSON index, so files that did not change are not reopened.
+
+    Args:
+        pattern (Union[str, List[str]]): Glob pattern (``**`` is recursive), directory or list of files.
+        deep (bool): Also read the first and last chunk of every variable, which catches truncated downloads. Default is False (header only, like check()).
+        workers (Optional[int]): Number of processes opening files. Default is None (sequential).
+        use_cache (bool): Whether to read and update the index. Default is True.
+        cache_file (Optional[str]): Path of the index. Default is None (~/.cache/oafuncs/nc_check.json).
+        delete_if_invalid (bool): Whether to delete files that fail the check. Default is False.
+        print_messages (bool): Whether to print failed files and a summary. Default is True.
+
+    Returns:
+        dict: Counts of "valid", "invalid" and "cached" files, and per-file results under "files".
+
+    Example:
+        >>> summary = check_many(r'/data/hycom/**/*.nc', workers=8)
+        >>> summary = check_many(r'/data/hycom', deep=True, delete_if_invalid=True)
+    """
+    from ._script.netcdf_check import check_many_nc
+
+    return check_many_nc(pattern, deep, workers, use_cache, cache_file, delete_if_invalid, print_messages)
+
+
 def convert_longitude(
     dataset: xr.Dataset,
     longitude_name: str = "longitude",
@@ -196,6 +364,10 @@ def convert_longitude(
     """
     Convert the longitude array to a specified range.
 
+    For a 1-D increasing longitude axis the conversion is a rotation, applied as a single index permutation instead of a full sort.
+    Lazily opened variables stay lazy (nothing is read until accessed), in-memory variables stay NumPy and dask variables stay dask.
+    Other axes fall back to sorting.
+
     Args:
         dataset (xr.Dataset): The xarray dataset containing the longitude data.
         longitude_name (str): Name of the longitude variable. Default is "longitude".
@@ -230,41 +402,61 @@ def convert_longitude(
     else:
         new_lon = lon % 360  # 自动处理负值
 
+    # 快速路径：一维单调递增的经度轴转换后只是一次循环移位，用一次整数索引 isel 代替排序；
+    # 与 Dataset.roll 不同，isel 对惰性打开的后端变量仍是惰性索引，不加载数据，也不需要 dask，
+    # 内存中的变量和 dask 变量则保持原来的类型
+    if lon.ndim == 1 and lon.dims[0] == longitude_name:
+        old_values, new_values = np.asarray(lon), np.asarray(new_lon)
+        breaks = np.flatnonzero(np.diff(new_values) <= 0)
+        if np.all(np.diff(old_values) > 0) and breaks.size <= 1:
+            shift = int(breaks[0]) + 1 if breaks.size else 0
+            if np.all(np.diff(np.roll(new_values, -shift)) > 0):
+                dataset = dataset.assign_coords({longitude_name: new_lon})
+                if shift == 0:
+                    return dataset
+                return dataset.isel({longitude_name: np.roll(np.arange(lon.size), -shift)})
+
     # 检查并处理重复坐标
     if len(new_lon) != len(np.unique(new_lon)):
         raise ValueError("转换导致经度坐标重复，请检查数据边界值")
 
-    # 仅当非单调时排序
-    if not new_lon.is_monotonic_increasing:
+    # 仅当非单调时排序（按转换后的经度）
+    dataset = dataset.assign_coords({longitude_name: new_lon})
+    if longitude_name in dataset.indexes and not dataset.indexes[longitude_name].is_monotonic_increasing:
         dataset = dataset.sortby(longitude_name)
 
-    return dataset.assign_coords({longitude_name: new_lon})
+    return dataset
 
 
 def isel(
     file_path: str,
     dimension_name: str,
-    indices: List[int],
-) -> xr.Dataset:
+    indices: Union[int, List[int], slice],
+    output_file: Optional[str] = None,
+    chunk_budget_mb: float = 256,
+) -> Optional[xr.Dataset]:
     """
     Select data by the index of a dimension.
 
+    Only the requested records are read, as netCDF4 hyperslabs (consecutive indices are read in one call), for every variable.
+
     Args:
         file_path (str): Path to the NetCDF file.
         dimension_name (str): Name of the dimension.
-        indices (List[int]): Indices of the dimension to select.
+        indices (Union[int, List[int], slice]): Indices of the dimension to select, in the order given (negative indices allowed).
+        output_file (Optional[str]): If given, write the subset straight to this file, keeping the source data types, packing, compression and chunking, and return None. Default is None.
+        chunk_budget_mb (float): Memory budget (MB) of one read. Default is 256.
 
     Returns:
-        xr.Dataset: Subset dataset.
+        Optional[xr.Dataset]: Subset dataset, decoded like xr.open_dataset and fully loaded in memory (the source file is closed), or None when output_file is given.
 
     Example:
         >>> subset = isel('file.nc', 'time', [0, 1, 2])
+        >>> isel('file.nc', 'time', slice(0, 24), output_file='first_day.nc')
     """
-    ds = xr.open_dataset(file_path)
-    indices = [int(i) for i in np.array(indices).flatten()]
-    ds_new = ds.isel(**{dimension_name: indices})
-    ds.close()
-    return ds_new
+    from ._script.netcdf_isel import isel_nc
+
+    return isel_nc(file_path, dimension_name, indices, output_file, chunk_budget_mb)
 
 
 def draw(
@@ -311,10 +503,12 @@ def draw(
         print("[red]No dataset or file provided.[/red]")
 
 
-def compress(src_path, dst_path=None, convert_dtype='int16'):
+def compress(src_path, dst_path=None, convert_dtype='int16', chunk_budget_mb=256, significant_bits=None, significant_digits=None):
     """
     压缩 NetCDF 文件，使用 scale_factor/add_offset 压缩数据。
     若 dst_path 省略，则自动生成新文件名，写出后删除原文件并将新文件改回原名。
+    数据以惰性方式打开并逐切片处理：先一遍求 min/max 得到打包参数，再一遍编码写出。
+    指定 significant_bits 或 significant_digits 时改为位舍入（保留 float32），并返回各变量的误差和压缩比报告。
     """
     src_path = str(src_path)
     # 判断是否要替换原文件
@@ -323,25 +517,63 @@ def compress(src_path, dst_path=None, convert_dtype='int16'):
         dst_path = src_path.replace(".nc", "_compress_temp.nc")
 
     ds = xr.open_dataset(src_path)
-    save(dst_path, ds, convert_dtype=convert_dtype, use_scale_offset=True, use_compression=True)
+    report = save(dst_path, ds, convert_dtype=convert_dtype, use_scale_offset=True, use_compression=True, streaming=True, chunk_budget_mb=chunk_budget_mb, significant_bits=significant_bits, significant_digits=significant_digits)
     ds.close()
 
     if delete_orig:
         os.remove(src_path)
         os.rename(dst_path, src_path)
-    pass
+    return report
+
+
+def compress_many(
+    pattern: Union[str, List[str]],
+    workers: Optional[int] = None,
+    convert_dtype: str = "int16",
+    chunk_budget_mb: float = 256,
+    significant_bits: Optional[int] = None,
+    significant_digits: Optional[int] = None,
+    skip_packed: bool = True,
+) -> dict:
+    """
+    Compress many NetCDF files in place on a process pool.
 
+    Args:
+        pattern (Union[str, List[str]]): Glob pattern (``**`` is recursive), directory or list of files.
+        workers (Optional[int]): Maximum number of processes. Default is None (number of CPUs). The actual number is also capped by available memory.
+        convert_dtype (str): Integer type used for packing. Default is 'int16'.
+        chunk_budget_mb (float): Memory budget (MB) of one slab in each process. Default is 256.
+        significant_bits (Optional[int]): Use bit-rounding instead of scale_factor/add_offset, see save(). Default is None.
+        significant_digits (Optional[int]): Same as significant_bits, given as decimal digits. Default is None.
+        skip_packed (bool): Skip files that are already compressed, i.e. have scale_factor attributes or compression filters such as zlib (checked from the header only). Default is True.
+
+    Returns:
+        dict: Counts of compressed/skipped/kept/failed files, total bytes "before" and "after", and per-file results under "files".
 
-def unscale(src_path, dst_path=None, compression_level=4):
+    Example:
+        >>> compress_many(r'/data/hycom/**/*.nc', workers=8)
+        >>> summary = compress_many([r'a.nc', r'b.nc'], significant_digits=3)
+    """
+    from ._script.netcdf_compress import compress_many_nc
+
+    return compress_many_nc(pattern, workers, convert_dtype, chunk_budget_mb, significant_bits, significant_digits, skip_packed)
+
+
+def unscale(src_path, dst_path=None, compression_level=4, chunk_budget_mb=256, workers=None):
     """解码 NetCDF 并移除 scale_factor/add_offset，写出真实值。
     保留压缩功能，但不使用比例因子和偏移量，以控制文件大小。
     若 dst_path 省略，则自动生成新文件名，写出后删除原文件并将新文件改回原名。
+    只读取文件头判断打包变量，逐变量、逐切片解码写出，未打包的变量原样复制，峰值内存与文件大小无关。
 
     Args:
         src_path: 源文件路径
         dst_path: 目标文件路径，None则替换原文件
         compression_level: 压缩级别(1-9)，数值越大压缩比越高，速度越慢
+        chunk_budget_mb: 单个切片的内存预算(MB)
+        workers: 并行解码变量的线程数，None则逐个处理
     """
+    from ._script.netcdf_unscale import unscale_nc
+
     src_path = str(src_path)
     # 判断是否要替换原文件
     delete_orig = dst_path is None
@@ -351,51 +583,7 @@ def unscale(src_path, dst_path=None, compression_level=4):
     # 打开原始文件，获取文件大小
     orig_size = os.path.getsize(src_path) / (1024 * 1024)  # MB
 
-    # 先以原始模式打开，查看哪些变量使用了scale_factor/add_offset
-    with xr.open_dataset(src_path, decode_cf=False) as ds_raw:
-        has_scaling = []
-        for var in ds_raw.data_vars:
-            if "scale_factor" in ds_raw[var].attrs or "add_offset" in ds_raw[var].attrs:
-                has_scaling.append(var)
-
-    print(f"[yellow]文件: {src_path} (原始大小: {orig_size:.2f} MB)[/yellow]")
-    if has_scaling:
-        print(f"[yellow]发现 {len(has_scaling)} 个变量使用了比例因子: {', '.join(has_scaling)}[/yellow]")
-    else:
-        print("[yellow]未发现任何变量使用比例因子，解包可能不必要[/yellow]")
-
-    # 解码模式打开
-    ds = xr.open_dataset(src_path, decode_cf=True)
-    encoding = {}
-
-    for var in ds.data_vars:
-        # 保存原始的_FillValue
-        fill_value = None
-        if "_FillValue" in ds[var].attrs:
-            fill_value = ds[var].attrs["_FillValue"]
-        elif "_FillValue" in ds[var].encoding:
-            fill_value = ds[var].encoding["_FillValue"]
-
-        # 清除scale_factor和add_offset属性
-        ds[var].attrs.pop("scale_factor", None)
-        ds[var].attrs.pop("add_offset", None)
-        ds[var].encoding.clear()
-
-        # 仅对数值型变量处理
-        if np.issubdtype(ds[var].dtype, np.number):
-            # 强制转换为float32，避免float64导致文件暴涨
-            if np.issubdtype(ds[var].dtype, np.floating) and ds[var].dtype != np.float32:
-                ds[var] = ds[var].astype(np.float32)
-
-            # 设置压缩参数，但不使用scale_factor/add_offset
-            encoding[var] = {"zlib": True, "complevel": compression_level, "dtype": ds[var].dtype}
-            # 恢复_FillValue
-            if fill_value is not None:
-                encoding[var]["_FillValue"] = fill_value
-
-    # 使用save函数保存，传入encoding确保只压缩不使用scale_factor
-    ds.to_netcdf(dst_path, encoding=encoding)
-    ds.close()
+    unscale_nc(src_path, dst_path, compression_level, chunk_budget_mb, workers)
 
     # 打印输出文件大小对比
     if os.path.exists(dst_path):
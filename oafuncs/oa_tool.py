@@ -1,6 +1,6 @@
 import datetime
 import logging
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 
 from rich import print
@@ -28,6 +28,18 @@ class PEx(ParallelExecutor):
     ...     print(executor.format_stats())
     [2024-06-08 15:30:00] 成功处理5个任务 (耗时0.5秒)
 
+    常驻进程池 (多次 run 复用同一批工作进程)：
+    >>> with PEx(persistent=True, initializer=load_mask, initargs=("mask.nc",)) as executor:
+    ...     for step in steps:
+    ...         results = executor.run(process_step, [(step, i) for i in range(100)])
+
+    每一步都共享新数组时，用完即释放共享内存：
+    >>> with PEx(persistent=True) as executor:
+    ...     for field in fields:
+    ...         handle = executor.share(field)
+    ...         results = executor.run(process_tile, [(handle, i) for i in range(100)])
+    ...         executor.release(handle)
+
     参数调整建议：
     - 内存密集型任务：增大 mem_per_process
     - I/O密集型任务：使用 mode='thread'
@@ -41,6 +53,10 @@ class PEx(ParallelExecutor):
         timeout_per_task: int = 7200,  # 延长默认超时时间
         max_retries: int = 5,  # 增加默认重试次数
         progress_callback: Optional[Callable[[int, int], None]] = None,
+        persistent: bool = False,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        max_tasks_per_child: Optional[int] = None,
     ):
         """
         初始化并行执行器
@@ -51,13 +67,27 @@ class PEx(ParallelExecutor):
         :param timeout_per_task: 单任务超时时间(秒)
         :param max_retries: 最大重试次数
         :param progress_callback: 进度回调函数 (当前完成数, 总数)
+        :param persistent: 是否在多次 run/imap 之间保留工作进程 (直到 shutdown)，避免每次重新启动进程和导入模块
+        :param initializer: 每个工作进程启动时执行一次的函数，可把重型状态 (如三角剖分、陆地掩膜) 存入模块级全局变量供任务使用
+        :param initargs: initializer 的参数
+        :param max_tasks_per_child: 平均每个工作进程完成多少个任务后换一批新进程 (按提交给进程池的任务总数计，是平均值而不是单个进程的上限)，initializer 会在新进程中重新执行，用于限制内存泄漏
         """
         # 时间记录扩展
         self.start_dt = datetime.datetime.now()
         self.end_dt = None
         self.progress_callback = progress_callback
 
-        super().__init__(max_workers=max_workers, chunk_size=chunk_size, mem_per_process=mem_per_process, timeout_per_task=timeout_per_task, max_retries=max_retries)
+        super().__init__(
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            mem_per_process=mem_per_process,
+            timeout_per_task=timeout_per_task,
+            max_retries=max_retries,
+            persistent=persistent,
+            initializer=initializer,
+            initargs=initargs,
+            max_tasks_per_child=max_tasks_per_child,
+        )
 
         logging.info(f"PEx initialized at {self.start_dt:%Y-%m-%d %H:%M:%S}")
 
@@ -81,6 +111,22 @@ class PEx(ParallelExecutor):
 
         return results
 
+    def imap(self, func: Callable, params: Iterable[Tuple], ordered: bool = True, max_in_flight: Optional[int] = None) -> Iterator[Any]:
+        """
+        流式执行并行任务，逐个产出结果
+
+        :param func: 目标函数，需能序列化(pickle)
+        :param params: 参数元组的可迭代对象 (可以是生成器，按需读取)
+        :param ordered: 是否按输入顺序产出结果，False 时按完成顺序产出
+        :param max_in_flight: 同时在途的最大任务数 (默认 2 倍工作进程数)，决定内存上限
+        :return: 结果迭代器
+        """
+        total = len(params) if hasattr(params, "__len__") else 0
+        for done, result in enumerate(super().imap(func, params, ordered, max_in_flight), 1):
+            if self.progress_callback:
+                self.progress_callback(done, max(total, done))
+            yield result
+
     def shutdown(self):
         """增强关闭方法，记录结束时间"""
         self.end_dt = datetime.datetime.now()
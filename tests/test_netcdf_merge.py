@@ -0,0 +1,118 @@
+import os
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+import xarray as xr
+
+from oafuncs._script.netcdf_merge import merge_nc
+
+
+def _write_packed(path, values, start, scale, offset, fill=-30000):
+    """按给定的打包参数写出 int16 变量，NaN 写为 fill"""
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", values.shape[1])
+        time = ds.createVariable("time", "f8", ("time",))
+        time.units = "days since 2000-01-01"
+        time[:] = np.arange(start, start + values.shape[0])
+        var = ds.createVariable("u", "i2", ("time", "x"), fill_value=fill)
+        var.scale_factor = scale
+        var.add_offset = offset
+        var.missing_value = np.int16(fill)
+        var.set_auto_maskandscale(False)
+        raw = np.rint((values - offset) / scale)
+        var[:] = np.where(np.isnan(values), fill, raw).astype(np.int16)
+
+
+@pytest.fixture
+def packed_files(tmp_path):
+    rng = np.random.default_rng(0)
+    files, expected = [], []
+    for i, (scale, offset) in enumerate([(0.01, 0.0), (0.05, 100.0), (0.02, -50.0)]):
+        values = rng.uniform(-200, 200, size=(4, 6)) * (i + 1) / 3
+        values[i, i] = np.nan
+        path = str(tmp_path / f"in{i}.nc")
+        _write_packed(path, values, 4 * i, scale, offset)
+        with xr.open_dataset(path) as ds:
+            expected.append(ds["u"].values)
+        files.append(path)
+    return files, np.concatenate(expected)
+
+
+@pytest.mark.parametrize("group_size", [None, 2])
+def test_repacked_merge_keeps_missing_values(tmp_path, packed_files, group_size):
+    files, expected = packed_files
+    target = str(tmp_path / "merged.nc")
+    merge_nc(files, dim_name="time", target_filename=target, streaming=True, group_size=group_size)
+
+    with nc.Dataset(target) as ds:
+        var = ds.variables["u"]
+        assert var._FillValue == var.missing_value == np.iinfo(np.int16).min
+    with xr.open_dataset(target) as ds:
+        merged = ds["u"].values
+    assert np.isnan(merged).sum() == np.isnan(expected).sum() == 3
+    np.testing.assert_array_equal(np.isnan(merged), np.isnan(expected))
+    np.testing.assert_allclose(merged, expected, atol=0.05, equal_nan=True)
+
+
+@pytest.mark.parametrize("chunk_budget_mb", [256, 1e-4])
+def test_tree_merge_matches_flat_merge(tmp_path, chunk_budget_mb):
+    rng = np.random.default_rng(1)
+    files = []
+    for i in range(5):
+        values = rng.uniform(-100, 100, size=(3, 6))
+        values[i % 3, i] = np.nan
+        path = str(tmp_path / f"in{i}.nc")
+        _write_packed(path, values, 3 * i, 0.01 * (i + 1), 10.0 * i)
+        files.append(path)
+
+    flat, tree = str(tmp_path / "flat.nc"), str(tmp_path / "tree.nc")
+    merge_nc(files, dim_name="time", target_filename=flat, streaming=True, chunk_budget_mb=chunk_budget_mb)
+    merge_nc(files, dim_name="time", target_filename=tree, group_size=2, chunk_budget_mb=chunk_budget_mb)
+
+    with nc.Dataset(flat) as a, nc.Dataset(tree) as b:
+        a.set_auto_maskandscale(False)
+        b.set_auto_maskandscale(False)
+        assert set(a.variables) == set(b.variables)
+        for name in a.variables:
+            assert a.variables[name].__dict__ == b.variables[name].__dict__
+            np.testing.assert_array_equal(a.variables[name][:], b.variables[name][:])
+
+
+def test_default_merge_keeps_target_on_failure(tmp_path, packed_files, monkeypatch):
+    files, _ = packed_files
+    target = str(tmp_path / "merged.nc")
+    with open(target, "wb") as f:
+        f.write(b"previous")
+
+    to_netcdf = xr.Dataset.to_netcdf
+
+    def failing_to_netcdf(self, path, *args, **kwargs):
+        to_netcdf(self, path, *args, **kwargs)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(xr.Dataset, "to_netcdf", failing_to_netcdf)
+    with pytest.raises(OSError):
+        merge_nc(files, dim_name="time", target_filename=target)
+    with open(target, "rb") as f:
+        assert f.read() == b"previous"
+    assert not (tmp_path / "merged.nc.part").exists()
+
+    monkeypatch.undo()
+    merge_nc(files, dim_name="time", target_filename=target)
+    with xr.open_dataset(target) as ds:
+        assert ds.sizes["time"] == 12
+
+
+def test_header_cache_is_bounded(tmp_path, packed_files, monkeypatch):
+    from oafuncs._script import netcdf_merge
+
+    files, expected = packed_files
+    monkeypatch.setattr(netcdf_merge, "_HEADER_CACHE", netcdf_merge.OrderedDict())
+    monkeypatch.setattr(netcdf_merge, "_MAX_HEADERS", 2)
+    target = str(tmp_path / "merged.nc")
+    merge_nc(files, dim_name="time", target_filename=target, streaming=True)
+    assert list(netcdf_merge._HEADER_CACHE) == [(os.path.abspath(f), os.path.getsize(f), os.stat(f).st_mtime_ns, "time") for f in files[1:]]
+    with xr.open_dataset(target) as ds:
+        np.testing.assert_allclose(ds["u"].values, expected, atol=0.05, equal_nan=True)
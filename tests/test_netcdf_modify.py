@@ -0,0 +1,50 @@
+import hashlib
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from oafuncs._script.netcdf_modify import edit_nc
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+@pytest.fixture
+def nc_file(tmp_path):
+    path = str(tmp_path / "edit.nc")
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("x", 3)
+        ds.createDimension("y", 2)
+        ds.createVariable("a", "f4", ("x",))[:] = [1, 2, 3]
+        ds.createVariable("b", "f4", ("x", "y"))[:] = np.zeros((3, 2))
+    return path
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        {"attrs": {"a": {"units": "m"}}, "rename": {"a": "b"}},
+        {"attrs": {"a": {"units": "m"}}, "rename": {"x": "y"}},
+        {"attrs": {"a": {"units": "m"}}, "rename": {"a": "c", "b": "c"}},
+        {"attrs": {"a": {"units": "m"}}, "values": {"b": np.ones(5)}},
+        {"values": {"a": [4, 5, 6]}, "attrs": {"a": {"units": "m"}}, "rename": {"missing": "c"}},
+        {"values": {"a": ["p", "q", "r"]}, "attrs": {None: {"title": "t"}}},
+        {"attrs": {"a": {"units": "m", "flags": {"bad": 1}}}},
+    ],
+)
+def test_rejected_batch_leaves_file_unchanged(nc_file, edits):
+    before = _digest(nc_file)
+    assert edit_nc(nc_file, edits) is False
+    assert _digest(nc_file) == before
+
+
+def test_batch_applies_values_attrs_and_renames(nc_file):
+    assert edit_nc(nc_file, {"values": {"a": [4, 5, 6]}, "attrs": {"a": {"units": "m"}, None: {"title": "t"}}, "rename": {"a": "c", "x": "n"}})
+    with nc.Dataset(nc_file) as ds:
+        assert ds.title == "t"
+        assert ds.variables["c"].units == "m"
+        assert ds.variables["c"].dimensions == ("n",)
+        np.testing.assert_array_equal(ds.variables["c"][:], [4, 5, 6])
@@ -0,0 +1,34 @@
+import netCDF4 as nc
+import numpy as np
+
+from oafuncs._script.netcdf_unscale import unscale_nc
+
+
+def test_unscale_float64_to_float32_and_unsigned_fill(tmp_path):
+    src, dst = str(tmp_path / "packed.nc"), str(tmp_path / "unpacked.nc")
+    with nc.Dataset(src, "w") as ds:
+        ds.createDimension("x", 4)
+        lon = ds.createVariable("x", "f8", ("x",))
+        lon[:] = np.linspace(0.1, 0.4, 4)
+        temp = ds.createVariable("temp", "f8", ("x",), fill_value=-999.0)
+        temp[:] = np.ma.masked_array([1.5, 2.5, 0.0, 4.5], mask=[0, 0, 1, 0])
+        # _Unsigned 打包变量：存储类型为 i2，填充值按有符号值 -1 保存（即无符号的 65535）
+        sst = ds.createVariable("sst", "i2", ("x",), fill_value=np.int16(-1))
+        sst._Unsigned = "true"
+        sst.scale_factor = 0.01
+        sst.add_offset = 0.0
+        sst.set_auto_maskandscale(False)
+        sst[:] = np.array([100, 60000, 65535, 0], dtype=np.uint16).view(np.int16)
+
+    assert unscale_nc(src, dst) == ["sst"]
+
+    with nc.Dataset(dst) as ds:
+        assert ds.variables["x"].dtype == np.float64
+        assert ds.variables["temp"].dtype == np.float32
+        assert ds.variables["sst"].dtype == np.float32
+        temp = ds.variables["temp"][:]
+        sst = ds.variables["sst"][:]
+    np.testing.assert_array_equal(np.ma.getmaskarray(temp), [False, False, True, False])
+    np.testing.assert_allclose(temp.compressed(), [1.5, 2.5, 4.5])
+    np.testing.assert_array_equal(np.ma.getmaskarray(sst), [False, False, True, False])
+    np.testing.assert_allclose(sst.compressed(), [1.0, 600.0, 0.0], rtol=1e-6)
@@ -0,0 +1,134 @@
+import netCDF4 as nc
+import numpy as np
+import pytest
+import xarray as xr
+
+from oafuncs._script.netcdf_write import _bitround, _data_to_scale_offset, _scale_offset_from_min_max, _update_bitround_stats, save_to_nc
+
+
+@pytest.mark.parametrize("dtype", ["int8", "int16", "int32", "int64"])
+def test_pack_extremes_stay_in_range(dtype):
+    data = np.array([-1e6, -3.5, 0.0, 1e6, np.nan])
+    scale, offset = _scale_offset_from_min_max(-1e6, 1e6, dtype)
+    packed, fill = _data_to_scale_offset(data, scale, offset, dtype)
+    assert packed[-1] == fill == np.iinfo(dtype).min
+    assert np.all(packed[:-1] > fill)
+    np.testing.assert_allclose(packed[:-1] * scale + offset, data[:-1], atol=scale)
+
+
+def test_bitround_stats_blockwise():
+    data = np.random.default_rng(0).normal(size=(20, 300)) * 10
+    data[0, :5] = np.nan
+    data[1, 1] = 0.0
+    rounded = _bitround(data, 7)
+    stats = {}
+    _update_bitround_stats(stats, data, rounded, block_size=777)
+
+    diff = np.abs(rounded.astype(np.float64) - data)
+    valid = np.isfinite(rounded)
+    nonzero = valid & (data != 0)
+    assert stats["max_abs_error"] == diff[valid].max()
+    assert stats["max_rel_error"] == pytest.approx((diff[nonzero] / np.abs(data[nonzero])).max())
+    assert stats["sample_bytes"] == rounded.nbytes
+
+
+@pytest.mark.parametrize("kind", ["numpy", "dataset", "streaming"])
+def test_verify_report_without_valid_data(tmp_path, kind):
+    values = np.full((3, 4), np.nan)
+    path = str(tmp_path / f"{kind}.nc")
+    if kind == "numpy":
+        report = save_to_nc(path, values, varname="u", coords={"y": np.arange(3), "x": np.arange(4)}, verify=True)
+    else:
+        report = save_to_nc(path, xr.Dataset({"u": (("y", "x"), values)}), streaming=kind == "streaming", verify=True)
+    assert set(report) == {"u"}
+    assert report["u"]["dtype"] == "float64"
+    assert report["u"]["scale_factor"] is None
+    assert np.isnan(report["u"]["max_abs_error"])
+
+
+def test_append_repacks_variable_without_fill_value(tmp_path):
+    path = str(tmp_path / "append.nc")
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", 3)
+        ds.createVariable("time", "f8", ("time",))[:] = [0.0, 1.0]
+        var = ds.createVariable("u", "i2", ("time", "x"))
+        var.scale_factor = 0.01
+        var.add_offset = 0.0
+        var.set_auto_maskandscale(False)
+        var[:] = np.array([[100, 200, -32768], [0, -100, 50]], dtype=np.int16)
+
+    new = xr.Dataset({"u": (("time", "x"), np.array([[1000.0, -1000.0, 5.0]]))}, coords={"time": [2.0]})
+    save_to_nc(path, new, append_dim="time")
+
+    with nc.Dataset(path) as ds:
+        var = ds.variables["u"]
+        var.set_auto_maskandscale(False)
+        raw = var[:]
+        scale = var.scale_factor
+        decoded = raw * scale + var.add_offset
+    assert raw[0, 2] == np.iinfo(np.int16).min
+    valid = raw != np.iinfo(np.int16).min
+    expected = np.array([[1.0, 2.0, 0.0], [0.0, -1.0, 0.5], [1000.0, -1000.0, 5.0]])
+    np.testing.assert_allclose(decoded[valid], expected[valid], atol=scale)
+
+
+@pytest.mark.parametrize("repack", [False, True])
+def test_append_keeps_custom_fill_value(tmp_path, repack):
+    path = str(tmp_path / "fill.nc")
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", 3)
+        ds.createVariable("time", "f8", ("time",))[:] = [0.0]
+        var = ds.createVariable("u", "i2", ("time", "x"), fill_value=-30000)
+        var.scale_factor = 0.01
+        var.add_offset = 0.0
+        var.set_auto_maskandscale(False)
+        var[:] = np.array([[100, -30000, 50]], dtype=np.int16)
+
+    values = [500.0, np.nan, 2.0] if repack else [1.0, np.nan, -300.0]
+    save_to_nc(path, xr.Dataset({"u": (("time", "x"), np.array([values]))}, coords={"time": [1.0]}), append_dim="time")
+
+    with nc.Dataset(path) as ds:
+        var = ds.variables["u"]
+        assert var._FillValue == -30000
+        assert (var.scale_factor != 0.01) == repack
+        data = var[:]
+    assert data.mask.tolist() == [[False, True, False], [False, True, False]]
+    np.testing.assert_allclose(data[0, [0, 2]], [1.0, 0.5], atol=0.01)
+    np.testing.assert_allclose(data[1, [0, 2]], [values[0], values[2]], atol=0.02)
+
+
+def test_append_validates_before_writing(tmp_path):
+    path = str(tmp_path / "validate.nc")
+    save_to_nc(path, xr.Dataset({"u": (("time", "x"), np.ones((2, 3)))}, coords={"time": [0.0, 1.0]}), append_dim="time")
+    with nc.Dataset(path, "r+") as ds:
+        ds.createVariable("time_bnds", "f8", ("time", "x"))
+    with open(path, "rb") as f:
+        before = f.read()
+    # 第二个变量的维度与文件不一致，其余变量也不应被追加
+    bad = xr.Dataset({"u": (("time", "x"), np.ones((1, 3))), "time_bnds": (("time",), [1.5])}, coords={"time": [2.0]})
+    with pytest.raises(ValueError):
+        save_to_nc(path, bad, append_dim="time")
+    with open(path, "rb") as f:
+        assert f.read() == before
+
+
+@pytest.mark.parametrize("kind", ["numpy", "dataarray", "dataset", "streaming"])
+def test_unpacked_output_uses_compression_options(tmp_path, kind):
+    values = np.random.default_rng(0).random((8, 10))
+    path = str(tmp_path / f"{kind}.nc")
+    options = dict(scale_offset_switch=False, compression_options={"complevel": 7, "chunksizes": (4, 5)})
+    if kind == "numpy":
+        save_to_nc(path, values, varname="u", coords={"y": np.arange(8), "x": np.arange(10)}, **options)
+    else:
+        da = xr.DataArray(values, dims=("y", "x"), name="u")
+        save_to_nc(path, da if kind == "dataarray" else da.to_dataset(), streaming=kind == "streaming", **options)
+
+    with nc.Dataset(path) as ds:
+        var = ds.variables["u"]
+        assert var.dtype == np.float64
+        assert "scale_factor" not in var.ncattrs()
+        assert var.filters()["zlib"] and var.filters()["complevel"] == 7
+        assert var.chunking() == [4, 5]
+        np.testing.assert_array_equal(var[:], values)
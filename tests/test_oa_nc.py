@@ -0,0 +1,34 @@
+import numpy as np
+import xarray as xr
+
+from oafuncs.oa_nc import convert_longitude
+
+
+def _dataset():
+    lon = np.arange(0, 360, 30.0)
+    data = np.arange(2 * lon.size, dtype=float).reshape(2, lon.size)
+    return xr.Dataset({"sst": (("time", "lon"), data)}, coords={"lon": lon})
+
+
+def _expected(ds):
+    lon = np.where(ds.lon.values > 180, ds.lon.values - 360, ds.lon.values)
+    return ds.assign_coords(lon=lon).sortby("lon")
+
+
+def test_convert_longitude_keeps_array_type(tmp_path):
+    ds = _dataset()
+    path = str(tmp_path / "lon.nc")
+    ds.to_netcdf(path)
+
+    out = convert_longitude(ds, "lon", 180)
+    assert isinstance(out.sst.data, np.ndarray)
+    xr.testing.assert_identical(out, _expected(ds))
+
+    loaded = convert_longitude(xr.load_dataset(path), "lon", 180)
+    assert isinstance(loaded.sst.data, np.ndarray)
+    xr.testing.assert_equal(loaded, _expected(ds))
+
+    with xr.open_dataset(path) as lazy:
+        out = convert_longitude(lazy, "lon", 180)
+        assert out.sst.chunks is None
+        xr.testing.assert_equal(out.load(), _expected(ds))
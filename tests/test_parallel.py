@@ -0,0 +1,54 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from oafuncs._script import parallel
+from oafuncs.oa_tool import PEx
+
+
+def _sum_shared(array):
+    return float(array.sum())
+
+
+def _attached_names(_):
+    return sorted(parallel._ATTACHED)
+
+
+def test_release_unlinks_and_workers_drop_attachments():
+    with PEx(max_workers=2, persistent=True) as executor:
+        names = []
+        for step in range(5):
+            handle = executor.share(np.full(1000, step, dtype=np.float64))
+            assert executor.run(_sum_shared, [(handle,)] * 4) == [1000.0 * step] * 4
+            executor.release(handle)
+            names.append(handle.name)
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=handle.name)
+        attached = executor.run(_attached_names, [(i,) for i in range(4)])
+    assert not any(set(names) & set(worker_names) for worker_names in attached)
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(tag):
+    _WORKER_STATE.update(tag=tag, token=os.urandom(8).hex(), count=0)
+
+
+def _count_task(_):
+    _WORKER_STATE["count"] += 1
+    return os.getpid(), _WORKER_STATE["tag"], _WORKER_STATE["token"], _WORKER_STATE["count"]
+
+
+def test_recycled_workers_rerun_initializer():
+    with PEx(max_workers=2, persistent=True, initializer=_init_worker, initargs=("mask",), max_tasks_per_child=2) as executor:
+        first = executor.run(_count_task, [(i,) for i in range(4)])
+        second = executor.run(_count_task, [(i,) for i in range(4)])
+    assert {r[1] for r in first + second} == {"mask"}
+    # 第二次调用前进程池已被替换：新进程重新执行 initializer，状态不会跨越回收边界
+    assert not {r[2] for r in first} & {r[2] for r in second}
+    for token in {r[2] for r in second}:
+        counts = sorted(r[3] for r in second if r[2] == token)
+        assert counts == list(range(1, len(counts) + 1))